@@ -0,0 +1,102 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import urlencode
+
+from fastapi import Request
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+from .config import settings
+from .metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Doit correspondre à workers/app/cache.py
+LIBRARY_VERSION_KEY = "library:version"
+CACHE_KEY_PREFIX = "cache:"
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+
+
+class ResponseCache:
+    """
+    Read-through cache of library reads in Redis.
+
+    Entries are namespaced by the library version, a counter the workers
+    increment after every commit that changes the library (see
+    workers/app/cache.py): a bump makes every older entry unreachable, so a
+    cached read is never older than the last ingest, and stale entries just
+    expire after RESPONSE_CACHE_TTL. The version doubles as the ETag, so a
+    client polling with If-None-Match gets a 304 from a single Redis GET.
+
+    Redis errors never fail a read: the loader is called directly instead.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def version(self) -> Optional[str]:
+        try:
+            version = await self.redis.get(LIBRARY_VERSION_KEY)
+            if version is None:
+                # Clé perdue (flush, éviction) : on repart d'une valeur qu'aucune entrée ne porte
+                await self.redis.set(LIBRARY_VERSION_KEY, time.time_ns(), nx=True)
+                version = await self.redis.get(LIBRARY_VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"Cache des lectures indisponible ({e}), lecture directe.")
+            return None
+        return version.decode() if isinstance(version, bytes) else version
+
+    async def _load_json(self, version: Optional[str], key: str, load: Loader, adapter: TypeAdapter) -> bytes:
+        cache_key = f"{CACHE_KEY_PREFIX}{version}:{key}"
+        if version is not None:
+            try:
+                body = await self.redis.get(cache_key)
+            except Exception as e:
+                logger.warning(f"Lecture du cache impossible ({e}), lecture directe.")
+                version = None
+            else:
+                if body is not None:
+                    CACHE_REQUESTS.labels("hit").inc()
+                    return body
+
+        CACHE_REQUESTS.labels("miss").inc()
+        body = adapter.dump_json(adapter.validate_python(await load(), from_attributes=True), by_alias=True)
+        if version is not None:
+            try:
+                await self.redis.set(cache_key, body, ex=settings.RESPONSE_CACHE_TTL)
+            except Exception as e:
+                logger.warning(f"Écriture du cache impossible ({e}).")
+        return body
+
+    async def lookup(self, key: str, load: Loader, value_type: Any) -> Any:
+        """`load()` (validated as `value_type`) through the cache, for lookups that are not responses."""
+        adapter = TypeAdapter(value_type)
+        return adapter.validate_json(await self._load_json(await self.version(), key, load, adapter))
+
+    async def response(self, request: Request, load: Loader, response_type: Any) -> Response:
+        """
+        JSON response for `request` (keyed on its path and query string),
+        serialized as `response_type`, or a 304 if the client's ETag is current.
+        """
+        version = await self.version()
+        headers = {"Cache-Control": "no-cache"}
+        if version is not None:
+            etag = f'"{version}"'
+            headers["ETag"] = etag
+            if _matches(request.headers.get("if-none-match"), etag):
+                CACHE_REQUESTS.labels("not_modified").inc()
+                return Response(status_code=304, headers=headers)
+
+        key = request.url.path
+        if request.query_params:
+            key += "?" + urlencode(sorted(request.query_params.multi_items()))
+        body = await self._load_json(version, key, load, TypeAdapter(response_type))
+        return Response(body, media_type="application/json", headers=headers)
@@ -5,6 +5,16 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     REDIS_URL: str  # Corrected to match docker-compose.yml
     ALLOWED_ORIGINS: str = "*"
+    # Where the worker stores media files (Media.file_path is relative to it)
+    NAS_MEDIA_PATH: str = "/data/media"
+    # Fan-out of the content-addressed layout (see paths.py): ab/cd/<hash>.ext
+    STORAGE_SHARD_DEPTH: int = 2
+    STORAGE_SHARD_WIDTH: int = 2
+    # Cookie jar shared with the workers: cookies.txt + one sites/<site>.txt per site
+    COOKIE_DIR: str = "/data/cookies"
+    # Library reads cached in Redis (see cache.py); invalidated by the workers on every ingest,
+    # the TTL only bounds how long superseded entries linger
+    RESPONSE_CACHE_TTL: int = 300
 
     model_config = SettingsConfigDict(extra='ignore')
 
@@ -1,55 +1,140 @@
+import asyncio
+import logging
+import os
+import tempfile
 import time
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, List, Optional, Set, Tuple
+
+from .urls import host_key
+
+logger = logging.getLogger(__name__)
+
+JAR_NAME = "cookies.txt"
+SITES_DIRNAME = "sites"
+# Cookies de session (sans date d'expiration) : durée de vie attribuée
+SESSION_COOKIE_TTL = 3600
+
+HEADER = "# Netscape HTTP Cookie File\n# This file is generated by MediaFetcher Extension\n\n"
+
+# (domain, path, name) -> Netscape line
+CookieKey = Tuple[str, str, str]
+
+
+def _site(domain: str) -> str:
+    return host_key("https://" + domain.lstrip("."))
+
+
+def _expiry(line: str) -> int:
+    try:
+        return int(line.split("\t")[4])
+    except (IndexError, ValueError):
+        return 0
+
+
+def _atomic_write(path: Path, lines: List[str]) -> None:
+    """Writes `path` through a temp file + rename: readers see the old or the new file, never a partial one."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(HEADER)
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
 
 class CookieManager:
-    def __init__(self, cookie_file: Path):
-        self.cookie_file = cookie_file
-        self.cookie_file.parent.mkdir(parents=True, exist_ok=True)
+    """
+    In-memory cookie jar indexed by site (see urls.host_key), persisted as
+    Netscape files in `cookie_dir`:
+
+    - `cookies.txt`: the whole jar;
+    - `sites/<site>.txt`: the cookies of one site, read by the workers so each
+      yt-dlp / gallery-dl run only parses what it needs.
+
+    Files are rewritten atomically (temp file + rename) in a thread, never on
+    the event loop, and expired cookies are pruned on every update.
+    """
+
+    def __init__(self, cookie_dir: Path):
+        self.cookie_dir = cookie_dir
+        self.cookie_file = cookie_dir / JAR_NAME
+        self.sites_dir = cookie_dir / SITES_DIRNAME
+        self.sites_dir.mkdir(parents=True, exist_ok=True)
+        self._sites: Dict[str, Dict[CookieKey, str]] = {}
+        self._lock = asyncio.Lock()
+        self._load()
+
+    def _load(self) -> None:
         if not self.cookie_file.exists():
-            self.cookie_file.touch()
+            return
+        with open(self.cookie_file, "r") as f:
+            for line in f:
+                if line.strip() and not line.startswith("#"):
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) >= 7:
+                        self._sites.setdefault(_site(parts[0]), {})[(parts[0], parts[2], parts[5])] = line
 
-    def update_cookies(self, new_cookies: List[Dict]):
+    def slice_for(self, url: str) -> Optional[Path]:
+        """Cookie file to use for `url`: its site slice, else the whole jar (None if there is none)."""
+        site_file = self.sites_dir / f"{host_key(url)}.txt"
+        if site_file.exists():
+            return site_file
+        return self.cookie_file if self.cookie_file.exists() else None
+
+    def _prune(self, now: float) -> Set[str]:
+        changed = set()
+        for site, cookies in self._sites.items():
+            expired = [key for key, line in cookies.items() if 0 < _expiry(line) < now]
+            for key in expired:
+                del cookies[key]
+            if expired:
+                changed.add(site)
+        return changed
+
+    def _write(self, jar: List[str], slices: Dict[str, List[str]]) -> None:
+        for site, lines in slices.items():
+            path = self.sites_dir / f"{site}.txt"
+            if lines:
+                _atomic_write(path, lines)
+            else:
+                path.unlink(missing_ok=True)
+        _atomic_write(self.cookie_file, jar)
+
+    async def update_cookies(self, new_cookies: List[Dict]) -> int:
         """
-        Met à jour le fichier cookies.txt avec les nouveaux cookies reçus.
-        Gère le format Netscape.
+        Merges the cookies sent by the extension into the jar and persists the
+        files of the sites that changed. Returns the number of cookies kept.
         """
-        domain_map = {}
-        
-        # 1. On charge les cookies existants pour ne pas tout écraser
-        if self.cookie_file.exists():
-            with open(self.cookie_file, 'r') as f:
-                for line in f:
-                    if line.strip() and not line.startswith('#'):
-                        parts = line.split('\t')
-                        if len(parts) >= 7:
-                            # Clé unique : domain + name
-                            key = (parts[0], parts[5])
-                            domain_map[key] = line
-
-        # 2. On insère/écrase avec les nouveaux cookies
-        for c in new_cookies:
-            # Conversion format Chrome extension -> Netscape
-            domain = c.get('domain', '')
-            # Netscape format requires strict structure
-            # domain, flag, path, secure, expiration, name, value
-            
-            # Gestion du flag (TRUE si le domaine commence par un point)
-            flag = "TRUE" if domain.startswith('.') else "FALSE"
-            path = c.get('path', '/')
-            secure = "TRUE" if c.get('secure', False) else "FALSE"
-            expiration = str(int(c.get('expirationDate', time.time() + 3600)))
-            name = c.get('name', '')
-            value = c.get('value', '')
-
-            netscape_line = f"{domain}\t{flag}\t{path}\t{secure}\t{expiration}\t{name}\t{value}\n"
-            
-            key = (domain, name)
-            domain_map[key] = netscape_line
-
-        # 3. On réécrit tout le fichier proprement
-        with open(self.cookie_file, 'w') as f:
-            f.write("# Netscape HTTP Cookie File\n")
-            f.write("# This file is generated by MediaFetcher Extension\n\n")
-            for line in domain_map.values():
-                f.write(line)
\ No newline at end of file
+        now = time.time()
+        async with self._lock:
+            changed = self._prune(now)
+            for c in new_cookies:
+                # Conversion format Chrome extension -> Netscape
+                # domain, flag, path, secure, expiration, name, value
+                domain = c.get('domain', '')
+                flag = "TRUE" if domain.startswith('.') else "FALSE"
+                path = c.get('path', '/')
+                secure = "TRUE" if c.get('secure', False) else "FALSE"
+                expires = c.get('expirationDate') or c.get('expires')
+                if not expires or expires <= 0:
+                    expires = now + SESSION_COOKIE_TTL
+                if expires < now:
+                    continue
+                name = c.get('name', '')
+                value = c.get('value', '')
+
+                site = _site(domain)
+                self._sites.setdefault(site, {})[(domain, path, name)] = (
+                    f"{domain}\t{flag}\t{path}\t{secure}\t{int(expires)}\t{name}\t{value}\n"
+                )
+                changed.add(site)
+
+            jar = [line for cookies in self._sites.values() for line in cookies.values()]
+            slices = {site: list(self._sites.get(site, {}).values()) for site in changed}
+            await asyncio.to_thread(self._write, jar, slices)
+            return len(jar)
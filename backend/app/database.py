@@ -20,6 +20,50 @@ AsyncSessionLocal = sessionmaker(
 # Create a Base class for declarative models
 Base = declarative_base()
 
+# `create_all` only creates missing tables: columns and indexes added to
+# existing tables after the first deployment are applied here (idempotent).
+SCHEMA_UPGRADES = [
+    "ALTER TABLE media ADD COLUMN IF NOT EXISTS extractor VARCHAR",
+    "ALTER TABLE media ADD COLUMN IF NOT EXISTS extractor_id VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_media_source_url ON media (source_url)",
+    "CREATE INDEX IF NOT EXISTS ix_media_extractor_extractor_id ON media (extractor, extractor_id)",
+    "ALTER TABLE media ADD COLUMN IF NOT EXISTS platform VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_media_created_at_id ON media (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_media_media_type_created_at_id ON media (media_type, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_media_platform_created_at_id ON media (platform, created_at, id)",
+    "ALTER TABLE media ADD COLUMN IF NOT EXISTS post_index INTEGER",
+    "ALTER TABLE media ADD COLUMN IF NOT EXISTS meta JSONB",
+    "ALTER TABLE media ADD COLUMN IF NOT EXISTS title VARCHAR",
+    "ALTER TABLE media ADD COLUMN IF NOT EXISTS uploader VARCHAR",
+    "ALTER TABLE media ADD COLUMN IF NOT EXISTS duration DOUBLE PRECISION",
+    "ALTER TABLE media ADD COLUMN IF NOT EXISTS tags VARCHAR[]",
+    "ALTER TABLE media ADD COLUMN IF NOT EXISTS description TEXT",
+    "ALTER TABLE media ADD COLUMN IF NOT EXISTS search_vector TSVECTOR",
+    # 'simple' configuration: titles come in every language, no stemming
+    """
+    CREATE OR REPLACE FUNCTION media_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.uploader, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(array_to_string(NEW.tags, ' '), '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.platform, '')), 'C') ||
+            setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'D');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER media_search_vector
+    BEFORE INSERT OR UPDATE OF title, uploader, tags, platform, description ON media
+    FOR EACH ROW EXECUTE FUNCTION media_search_vector_update()
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_media_search_vector ON media USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_media_title_trgm ON media USING gin (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_folders_parent_id ON folders (parent_id)",
+    "CREATE INDEX IF NOT EXISTS ix_media_folders_folder_id ON media_folders (folder_id)",
+]
+
 async def init_db():
     """
     Initialize the database, create the UUID extension, and create all tables.
@@ -27,8 +71,13 @@ async def init_db():
     async with engine.begin() as conn:
         # Ensure the uuid-ossp extension is enabled
         await conn.execute(text('CREATE EXTENSION IF NOT EXISTS "uuid-ossp"'))
+        # Trigram indexes (fuzzy search) must exist before create_all
+        await conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
         # Create all tables
         await conn.run_sync(Base.metadata.create_all)
+        # Bring tables created by older versions up to date
+        for statement in SCHEMA_UPGRADES:
+            await conn.execute(text(statement))
 
 # Dependency for FastAPI to get a DB session
 async def get_db() -> AsyncSession:
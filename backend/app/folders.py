@@ -0,0 +1,73 @@
+import uuid
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, schemas
+
+# Guard against parent_id cycles in the recursive query
+MAX_FOLDER_DEPTH = 64
+
+
+async def load_folder_tree(db: AsyncSession, root_id: Optional[uuid.UUID] = None) -> List[schemas.FolderNode]:
+    """
+    Loads the whole folder tree (or the subtree under `root_id`) with its
+    media counts and sizes in one query: a recursive CTE walks the folders,
+    the per-folder stats are joined in, and the nesting and subtree totals
+    are then assembled in a single pass here.
+    """
+    folders = models.Folder.__table__
+    links = models.media_folders
+
+    start = select(folders.c.id, folders.c.name, folders.c.parent_id, folders.c.created_at,
+                   literal(0).label("depth"))
+    start = start.where(folders.c.id == root_id) if root_id else start.where(folders.c.parent_id.is_(None))
+    tree = start.cte("tree", recursive=True)
+    tree = tree.union_all(
+        select(folders.c.id, folders.c.name, folders.c.parent_id, folders.c.created_at, tree.c.depth + 1)
+        .join(tree, folders.c.parent_id == tree.c.id)
+        .where(tree.c.depth < MAX_FOLDER_DEPTH)
+    )
+
+    stats = (
+        select(links.c.folder_id, func.count().label("media_count"),
+               func.sum(models.Media.file_size).label("total_bytes"))
+        .join(models.Media, models.Media.id == links.c.media_id)
+        .where(links.c.folder_id.in_(select(tree.c.id)))
+        .group_by(links.c.folder_id)
+        .subquery()
+    )
+    stmt = (
+        select(tree, func.coalesce(stats.c.media_count, 0), func.coalesce(stats.c.total_bytes, 0))
+        .outerjoin(stats, stats.c.folder_id == tree.c.id)
+        .order_by(tree.c.depth, tree.c.name)
+    )
+    rows = (await db.execute(stmt)).all()
+    if root_id and not rows:
+        raise HTTPException(status_code=404, detail="Folder not found")
+
+    nodes: Dict[uuid.UUID, schemas.FolderNode] = {}
+    roots: List[schemas.FolderNode] = []
+    # Rows come parents first (ordered by depth): every parent exists when its children arrive
+    for folder_id, name, parent_id, created_at, _, media_count, total_bytes in rows:
+        node = schemas.FolderNode(
+            id=folder_id, name=name, parent_id=parent_id, created_at=created_at,
+            media_count=media_count, total_bytes=total_bytes,
+            subtree_media_count=media_count, subtree_bytes=total_bytes,
+        )
+        nodes[folder_id] = node
+        parent = nodes.get(parent_id)
+        if parent is not None and folder_id != root_id:
+            parent.children.append(node)
+        else:
+            roots.append(node)
+
+    # Subtree totals, deepest folders first
+    for node in reversed(list(nodes.values())):
+        parent = nodes.get(node.parent_id)
+        if parent is not None and node.id != root_id:
+            parent.subtree_media_count += node.subtree_media_count
+            parent.subtree_bytes += node.subtree_bytes
+    return roots
@@ -0,0 +1,221 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from arq.connections import ArqRedis
+from arq.constants import in_progress_key_prefix, job_key_prefix, result_key_prefix
+from arq.jobs import deserialize_job, deserialize_result, serialize_job
+from arq.utils import ms_to_datetime, timestamp_ms
+
+DOWNLOAD_QUEUE = "arq:queue"
+
+# Priority lanes, fed into DOWNLOAD_QUEUE by the workers (workers/app/lanes.py)
+LANE_KEY_PREFIX = "arq:lane:"
+LANES = ("interactive", "normal", "bulk")
+# A bulk backlog can wait longer than arq's default payload lifetime (1 day)
+LANE_JOB_EXPIRES_MS = 7 * 24 * 3600 * 1000
+
+
+def lane_key(lane: str) -> str:
+    return LANE_KEY_PREFIX + lane
+
+# Doit correspondre à workers/app/progress.py
+PROGRESS_KEY_PREFIX = "jobs:progress:"
+# Finished download jobs, counted by the workers (must match workers/app/lanes.py)
+JOB_COUNTS_KEY = "arq:job-counts"
+# Recently finished download jobs by outcome, job id -> finish time (ms)
+FINISHED_KEY_PREFIX = "arq:finished:"
+
+JOB_STATES = ("queued", "deferred", "in_progress", "complete", "failed")
+
+
+async def enqueue_jobs(
+    redis_pool: ArqRedis,
+    function: str,
+    args_list: Iterable[Sequence[Any]],
+    queue_name: str = DOWNLOAD_QUEUE,
+    lane: Optional[str] = None,
+) -> List[str]:
+    """
+    Enqueues one arq job per entry of `args_list` in a single Redis pipeline.
+
+    Writes exactly what `ArqRedis.enqueue_job` writes (job payload + queue
+    entry) but without its per-job WATCH/MULTI round trips, which is safe
+    because every job gets a fresh random id. With `lane`, jobs go to that
+    priority lane instead of `queue_name`.
+    """
+    enqueue_time_ms = timestamp_ms()
+    expires_ms = redis_pool.expires_extra_ms
+    if lane:
+        queue_name = lane_key(lane)
+        expires_ms = LANE_JOB_EXPIRES_MS
+    job_ids: List[str] = []
+    scores = {}
+
+    async with redis_pool.pipeline(transaction=False) as pipe:
+        for args in args_list:
+            job_id = uuid4().hex
+            job = serialize_job(function, tuple(args), {}, None, enqueue_time_ms,
+                                serializer=redis_pool.job_serializer)
+            pipe.psetex(job_key_prefix + job_id, expires_ms, job)
+            scores[job_id] = enqueue_time_ms
+            job_ids.append(job_id)
+        if scores:
+            pipe.zadd(queue_name, scores)
+            await pipe.execute()
+
+    return job_ids
+
+
+def _error_message(result: Any) -> str:
+    return f"{result.__class__.__name__}: {result}" if isinstance(result, BaseException) else str(result)
+
+
+async def job_statuses(redis_pool: ArqRedis, job_ids: Sequence[str]) -> List[Dict[str, Any]]:
+    """
+    Resolves the state of many jobs in one pipeline round trip, from the
+    keys arq maintains (result, in-progress marker, queue entry, payload)
+    plus the last progress message published by the worker.
+    """
+    if not job_ids:
+        return []
+
+    async with redis_pool.pipeline(transaction=False) as pipe:
+        for job_id in job_ids:
+            pipe.get(result_key_prefix + job_id)
+            pipe.exists(in_progress_key_prefix + job_id)
+            pipe.zscore(DOWNLOAD_QUEUE, job_id)
+            pipe.get(job_key_prefix + job_id)
+            pipe.get(PROGRESS_KEY_PREFIX + job_id)
+            for lane in LANES:
+                pipe.zscore(lane_key(lane), job_id)
+        replies = await pipe.execute()
+
+    now_ms = timestamp_ms()
+    statuses = []
+    per_job = 5 + len(LANES)
+    for i, job_id in enumerate(job_ids):
+        raw_result, in_progress, score, raw_job, raw_progress, *lane_scores = replies[i * per_job:(i + 1) * per_job]
+        status: Dict[str, Any] = {"job_id": job_id, "status": "not_found"}
+        for lane, lane_score in zip(LANES, lane_scores):
+            if lane_score is not None:
+                # Encore dans sa file prioritaire : pas encore transmis à arq
+                status["lane"] = lane
+                score = lane_score
+
+        if raw_result:
+            info = deserialize_result(raw_result, deserializer=redis_pool.job_deserializer)
+            status.update(
+                status="complete" if info.success else "failed",
+                url=info.args[0] if info.args else None,
+                enqueue_time=info.enqueue_time,
+                start_time=info.start_time,
+                finish_time=info.finish_time,
+            )
+            if info.success:
+                status["result"] = info.result if isinstance(info.result, dict) else {"value": info.result}
+            else:
+                status["error"] = _error_message(info.result)
+        elif raw_job:
+            info = deserialize_job(raw_job, deserializer=redis_pool.job_deserializer)
+            if in_progress:
+                state = "in_progress"
+            elif score is not None and score > now_ms:
+                state = "deferred"
+            else:
+                state = "queued"
+            status.update(status=state, url=info.args[0] if info.args else None, enqueue_time=info.enqueue_time)
+            # Score des jobs prêts = rang de priorité (voir workers/app/lanes.py), pas une date
+            if state == "deferred":
+                status["scheduled_time"] = ms_to_datetime(int(score))
+
+        if raw_progress:
+            status["progress"] = json.loads(raw_progress)
+        statuses.append(status)
+    return statuses
+
+
+async def _split_ready_queue(redis_pool: ArqRedis, now_ms: int) -> Tuple[List[str], List[str]]:
+    """
+    Jobs of the arq queue due now, as (waiting for a worker, running).
+    Running jobs stay in the queue until arq finishes them and carry an
+    in-progress key; only this queue's keys are checked, so other arq queues
+    (transcoding) never show up. The due part of the queue is only
+    LANE_QUEUE_DEPTH jobs plus the running ones (see workers/app/lanes.py),
+    so it is read whole.
+    """
+    raw_ids = await redis_pool.zrangebyscore(DOWNLOAD_QUEUE, "-inf", now_ms)
+    ids = [i.decode() if isinstance(i, bytes) else i for i in raw_ids]
+    if not ids:
+        return [], []
+    async with redis_pool.pipeline(transaction=False) as pipe:
+        for job_id in ids:
+            pipe.exists(in_progress_key_prefix + job_id)
+        flags = await pipe.execute()
+    ready = [job_id for job_id, in_progress in zip(ids, flags) if not in_progress]
+    running = [job_id for job_id, in_progress in zip(ids, flags) if in_progress]
+    return ready, running
+
+
+async def _queued_ids(redis_pool: ArqRedis, now_ms: int, offset: int, limit: int) -> List[str]:
+    """Ready jobs, arq queue first then each lane by priority; `offset` spans all of them."""
+    ready, _ = await _split_ready_queue(redis_pool, now_ms)
+    ids = ready[offset:offset + limit]
+    offset = max(0, offset - len(ready))
+    if len(ids) >= limit:
+        return ids
+    for key in (lane_key(lane) for lane in LANES):
+        size = await redis_pool.zcount(key, "-inf", now_ms)
+        if offset >= size:
+            offset -= size
+            continue
+        raw_ids = await redis_pool.zrangebyscore(key, "-inf", now_ms, start=offset, num=limit - len(ids))
+        ids.extend(i.decode() if isinstance(i, bytes) else i for i in raw_ids)
+        offset = 0
+        if len(ids) >= limit:
+            break
+    return ids
+
+
+async def list_jobs(redis_pool: ArqRedis, state: str, cursor: int = 0, limit: int = 50) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    One page of jobs in `state`, paged by offset: queued/deferred jobs oldest
+    first, in-progress jobs in queue order, finished jobs (those still having
+    a result) most recent first. Returns (jobs, next_cursor), next_cursor
+    being None on the last page.
+    """
+    now_ms = timestamp_ms()
+    if state == "queued":
+        ids = await _queued_ids(redis_pool, now_ms, cursor, limit)
+    elif state == "deferred":
+        raw_ids = await redis_pool.zrangebyscore(DOWNLOAD_QUEUE, f"({now_ms}", "+inf", start=cursor, num=limit)
+        ids = [i.decode() if isinstance(i, bytes) else i for i in raw_ids]
+    elif state == "in_progress":
+        _, running = await _split_ready_queue(redis_pool, now_ms)
+        ids = running[cursor:cursor + limit]
+    else:
+        raw_ids = await redis_pool.zrevrange(FINISHED_KEY_PREFIX + state, cursor, cursor + limit - 1)
+        ids = [i.decode() if isinstance(i, bytes) else i for i in raw_ids]
+    next_cursor = cursor + len(ids) if len(ids) == limit else None
+
+    jobs = await job_statuses(redis_pool, ids)
+    return [j for j in jobs if j["status"] == state], next_cursor
+
+
+async def job_counts(redis_pool: ArqRedis) -> Dict[str, int]:
+    """Counters for the dashboard (complete / failed: totals kept by the workers)."""
+    now_ms = timestamp_ms()
+    counts: Dict[str, Any] = dict.fromkeys(JOB_STATES, 0)
+
+    async with redis_pool.pipeline(transaction=False) as pipe:
+        pipe.zcount(DOWNLOAD_QUEUE, f"({now_ms}", "+inf")
+        pipe.hmget(JOB_COUNTS_KEY, "complete", "failed")
+        for lane in LANES:
+            pipe.zcard(lane_key(lane))
+        counts["deferred"], (complete, failed), *lane_sizes = await pipe.execute()
+    counts["complete"], counts["failed"] = int(complete or 0), int(failed or 0)
+    counts["lanes"] = dict(zip(LANES, lane_sizes))
+    ready, running = await _split_ready_queue(redis_pool, now_ms)
+    counts["queued"] = len(ready) + sum(lane_sizes)
+    counts["in_progress"] = len(running)
+    return counts
@@ -18,22 +18,36 @@ from .config import settings
 app = FastAPI()
 
 # Add a startup event to initialize the database
-from fastapi import FastAPI, HTTPException, Depends
+import asyncio
+import uuid
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from typing import Dict, List, Optional
 from pathlib import Path
 import redis.asyncio as redis
 from arq import create_pool
 from arq.connections import RedisSettings
-from sqlalchemy import select
+from sqlalchemy import func, or_, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from urllib.parse import urlparse
+from datetime import datetime
 
 # App-specific imports
 from . import models, schemas
 from .database import init_db, get_db
+from .cache import ResponseCache
 from .cookies import CookieManager
 from .config import settings
+from .playlists import expand_playlist
+from .progress import ProgressHub
+from .streaming import MediaFileResponse
+from .paths import media_abspath
+from .similarity import MAX_DISTANCE, find_similar
+from .folders import load_folder_tree
+from .pagination import capped_count, decode_rank_cursor, decode_time_cursor, encode_cursor
+from .jobs import enqueue_jobs, job_counts, job_statuses, list_jobs
+from .metrics import JOBS_ENQUEUED, MetricsMiddleware, metrics_response
+from .urls import normalize_url
 
 app = FastAPI()
 
@@ -47,10 +61,16 @@ async def startup_event():
     app.state.redis_pool = await create_pool(
         RedisSettings(host=redis_url.hostname, port=redis_url.port)
     )
+    # Single Redis subscription shared by every /ws/jobs client
+    app.state.progress_hub = ProgressHub(app.state.redis_pool)
+    await app.state.progress_hub.start()
+    # Lectures de la bibliothèque servies depuis Redis, invalidées par les workers
+    app.state.response_cache = ResponseCache(app.state.redis_pool)
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await app.state.progress_hub.stop()
     if app.state.redis_pool:
         await app.state.redis_pool.close()
 
@@ -62,41 +82,359 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
-cookie_manager = CookieManager(Path("/data/cookies.txt"))
+cookie_manager = CookieManager(Path(settings.COOKIE_DIR))
+
+# Doit correspondre à workers/app/previews.py
+PREVIEWS_DIRNAME = ".previews"
 
 @app.get("/")
 def read_root():
     return {"message": "MediaFetcher Backend is Ready 🚀"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(redis_pool: redis.Redis = Depends(lambda: app.state.redis_pool)):
+    """Prometheus scrape endpoint (the workers serve theirs on METRICS_PORT)."""
+    return await metrics_response(redis_pool)
+
 @app.post("/api/download", response_model=schemas.DownloadResponse)
 async def enqueue_download(request: schemas.DownloadRequest, redis_pool: redis.Redis = Depends(lambda: app.state.redis_pool)):
     if not request.url:
         raise HTTPException(status_code=400, detail="URL is required")
     
-    job = await redis_pool.enqueue_job("download_media_task", request.url, _queue_name="arq:queue")
-    return {"job_id": job.job_id, "status": "queued"}
+    lane = request.lane or schemas.Lane.INTERACTIVE
+    job_ids = await enqueue_jobs(redis_pool, "download_media_task", [(request.url,)], lane=lane.value)
+    JOBS_ENQUEUED.labels(lane.value).inc()
+    return {"job_id": job_ids[0], "status": "queued", "lane": lane}
+
+@app.post("/api/download/batch", response_model=schemas.BatchDownloadResponse)
+async def enqueue_download_batch(request: schemas.BatchDownloadRequest, redis_pool: redis.Redis = Depends(lambda: app.state.redis_pool)):
+    """Enqueues many URLs (optionally expanding playlists) in a single Redis pipeline."""
+    urls = [u.strip() for u in request.urls if u and u.strip()]
+    if not urls:
+        raise HTTPException(status_code=400, detail="At least one URL is required")
+
+    if request.expand_playlists:
+        expanded = await asyncio.gather(*(expand_playlist(u, cookie_manager.slice_for(u)) for u in urls))
+        urls = [u for entries in expanded for u in entries]
+
+    # Dédup intra-batch sur l'URL normalisée (même clé que le worker)
+    seen = set()
+    unique_urls = []
+    for u in urls:
+        key = normalize_url(u)
+        if key not in seen:
+            seen.add(key)
+            unique_urls.append(u)
+
+    lane = request.lane or (schemas.Lane.BULK if request.expand_playlists else schemas.Lane.NORMAL)
+    job_ids = await enqueue_jobs(redis_pool, "download_media_task", ((u,) for u in unique_urls), lane=lane.value)
+    JOBS_ENQUEUED.labels(lane.value).inc(len(job_ids))
+    return schemas.BatchDownloadResponse(
+        jobs=[schemas.QueuedJob(url=u, job_id=j) for u, j in zip(unique_urls, job_ids)],
+        count=len(job_ids),
+        duplicates=len(urls) - len(unique_urls),
+        lane=lane,
+    )
+
+@app.post("/api/jobs/status", response_model=List[schemas.JobStatus])
+async def get_jobs_status(request: schemas.JobStatusRequest, redis_pool: redis.Redis = Depends(lambda: app.state.redis_pool)):
+    """Bulk status lookup: any number of job ids, one Redis round trip."""
+    return await job_statuses(redis_pool, request.job_ids)
+
+@app.get("/api/jobs/counts", response_model=schemas.JobCounts)
+async def get_job_counts(redis_pool: redis.Redis = Depends(lambda: app.state.redis_pool)):
+    return await job_counts(redis_pool)
+
+@app.get("/api/jobs", response_model=schemas.JobPage)
+async def get_jobs(
+    state: schemas.JobState = schemas.JobState.QUEUED,
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    redis_pool: redis.Redis = Depends(lambda: app.state.redis_pool),
+):
+    jobs, next_cursor = await list_jobs(redis_pool, state.value, cursor, limit)
+    return schemas.JobPage(jobs=jobs, next_cursor=next_cursor)
+
+@app.get("/api/jobs/{job_id}", response_model=schemas.JobStatus)
+async def get_job(job_id: str, redis_pool: redis.Redis = Depends(lambda: app.state.redis_pool)):
+    status = (await job_statuses(redis_pool, [job_id]))[0]
+    if status["status"] == "not_found":
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
 
 @app.post("/api/update-cookies", response_model=schemas.CookieUpdateResponse)
 async def update_cookies(payload: schemas.CookieUpdateRequest):
-    """Receives cookies from the extension and updates the file."""
+    """Receives cookies from the extension and updates the cookie files."""
     try:
         if not payload.cookies:
             return schemas.CookieUpdateResponse(status="ignored", count=0)
             
-        cookie_manager.update_cookies([c.dict() for c in payload.cookies])
+        await cookie_manager.update_cookies([c.dict() for c in payload.cookies])
         return schemas.CookieUpdateResponse(status="success", count=len(payload.cookies))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/media", response_model=List[schemas.Media])
-async def list_media(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Media).limit(100))
-    media_items = result.scalars().all()
-    return media_items
+@app.get("/api/media", response_model=schemas.MediaPage)
+async def list_media(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    media_type: Optional[schemas.MediaType] = None,
+    platform: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    cache: ResponseCache = Depends(lambda: app.state.response_cache),
+):
+    """
+    Media feed, newest first, keyset-paginated on (created_at, id): each page
+    is an index range scan, whatever its depth. Served from the response
+    cache (ETag / If-None-Match) until the next ingest.
+    """
+    async def load():
+        stmt = select(models.Media)
+        if media_type:
+            stmt = stmt.where(models.Media.media_type == media_type.value)
+        if platform:
+            stmt = stmt.where(models.Media.platform == platform)
+        if since:
+            stmt = stmt.where(models.Media.created_at >= since)
+        if until:
+            stmt = stmt.where(models.Media.created_at < until)
+        filtered = stmt
+
+        if cursor:
+            stmt = stmt.where(tuple_(models.Media.created_at, models.Media.id) < decode_time_cursor(cursor))
+        stmt = stmt.order_by(models.Media.created_at.desc(), models.Media.id.desc()).limit(limit + 1)
+
+        rows = (await db.execute(stmt)).scalars().all()
+        items = rows[:limit]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if len(rows) > limit else None
+
+        page = schemas.MediaPage.model_validate({"items": items, "next_cursor": next_cursor}, from_attributes=True)
+        if cursor is None:
+            unfiltered = not (media_type or platform or since or until)
+            page.total, page.total_is_estimate = await capped_count(db, filtered, "media" if unfiltered else None)
+        return page
+
+    return await cache.response(request, load, schemas.MediaPage)
+
+@app.get("/api/search", response_model=schemas.SearchPage)
+async def search_media(
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    media_type: Optional[schemas.MediaType] = None,
+    platform: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Searches titles, uploaders, tags, platforms and descriptions (GIN
+    tsvector index), plus fuzzy title matches (pg_trgm) for typos. Results are
+    ranked, best first, and keyset-paginated on (rank, id).
+    """
+    tsquery = func.websearch_to_tsquery("simple", q)
+    rank = (
+        func.ts_rank_cd(models.Media.search_vector, tsquery)
+        + func.similarity(func.coalesce(models.Media.title, ""), q)
+    ).label("rank")
+    matches = select(models.Media.id, rank).where(or_(
+        models.Media.search_vector.op("@@")(tsquery),
+        models.Media.title.op("%")(q),
+    ))
+    if media_type:
+        matches = matches.where(models.Media.media_type == media_type.value)
+    if platform:
+        matches = matches.where(models.Media.platform == platform)
+    matches = matches.subquery()
+
+    stmt = select(models.Media, matches.c.rank).join(matches, models.Media.id == matches.c.id)
+    if cursor:
+        stmt = stmt.where(tuple_(matches.c.rank, matches.c.id) < decode_rank_cursor(cursor))
+    stmt = stmt.order_by(matches.c.rank.desc(), matches.c.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(stmt)).all()
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1].rank, items[-1].Media.id) if len(rows) > limit else None
+    return schemas.SearchPage.model_validate(
+        {"items": [row.Media for row in items], "next_cursor": next_cursor}, from_attributes=True
+    )
+
+def resolve_media_path(file_path: str) -> Path:
+    """Absolute path of a stored file, refusing anything outside NAS_MEDIA_PATH."""
+    root = Path(settings.NAS_MEDIA_PATH).resolve()
+    path = media_abspath(file_path, str(root)).resolve()
+    if not path.is_relative_to(root):
+        raise HTTPException(status_code=404, detail="Media file not found")
+    return path
+
+@app.api_route("/api/media/{media_id}/content", methods=["GET", "HEAD"])
+async def get_media_content(media_id: uuid.UUID, request: Request, rendition: Optional[str] = None,
+                            db: AsyncSession = Depends(get_db),
+                            cache: ResponseCache = Depends(lambda: app.state.response_cache)):
+    """
+    Streams a stored file (Range/206 for seeking, immutable caching keyed on
+    the file hash). `rendition` (e.g. `h264_mp4`) selects a transcoded version.
+    The file lookup is cached: seeking a video does not query the database.
+    """
+    async def load():
+        if rendition:
+            media = (await db.execute(
+                select(models.MediaRendition)
+                .where(models.MediaRendition.media_id == media_id, models.MediaRendition.profile == rendition)
+            )).scalars().first()
+        else:
+            media = await db.get(models.Media, media_id)
+        if media is None:
+            raise HTTPException(status_code=404, detail="Media not found")
+        return {"file_path": media.file_path, "file_hash": media.file_hash}
+
+    stored = await cache.lookup(f"content:{media_id}:{rendition or ''}", load, Dict[str, str])
+    path = resolve_media_path(stored["file_path"])
+    try:
+        return MediaFileResponse(str(path), request, etag=stored["file_hash"])
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Media file not found")
+
+@app.get("/api/media/{media_id}/similar", response_model=List[schemas.SimilarMedia])
+async def get_similar_media(
+    media_id: uuid.UUID,
+    request: Request,
+    max_distance: int = Query(8, ge=0, le=MAX_DISTANCE),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    cache: ResponseCache = Depends(lambda: app.state.response_cache),
+):
+    """
+    Near-duplicates of a media (re-encodes, resizes, re-uploads), from the
+    perceptual hashes computed by the worker. Empty until the media is indexed.
+    """
+    async def load():
+        if await db.get(models.Media, media_id) is None:
+            raise HTTPException(status_code=404, detail="Media not found")
+        phashes = (await db.execute(
+            select(models.MediaPHash.phash).where(models.MediaPHash.media_id == media_id).order_by(models.MediaPHash.seq)
+        )).scalars().all()
+        matches = await find_similar(db, phashes, max_distance, limit, exclude_media_id=media_id)
+        if not matches:
+            return []
+
+        media = {m.id: m for m in (await db.execute(
+            select(models.Media).where(models.Media.id.in_([media_id for media_id, _, _ in matches]))
+        )).scalars().all()}
+        return [
+            schemas.SimilarMedia.model_validate(
+                {"media": media[similar_id], "distance": distance, "score": score}, from_attributes=True
+            )
+            for similar_id, distance, score in matches if similar_id in media
+        ]
+
+    return await cache.response(request, load, List[schemas.SimilarMedia])
+
+PREVIEW_FILES = {"poster.jpg", "thumb.webp", "sprite.jpg", "sprite.json"}
+
+@app.api_route("/api/previews/{file_hash}/{name}", methods=["GET", "HEAD"])
+async def get_preview(file_hash: str, name: str, request: Request):
+    """
+    Serves a generated preview. Previews are addressed by file hash, so no
+    DB lookup is needed and responses are cached as immutable.
+    """
+    if name not in PREVIEW_FILES or len(file_hash) != 64 or not all(c in "0123456789abcdef" for c in file_hash):
+        raise HTTPException(status_code=404, detail="Preview not found")
+    path = resolve_media_path(f"{PREVIEWS_DIRNAME}/{file_hash[:2]}/{file_hash}/{name}")
+    try:
+        return MediaFileResponse(str(path), request, etag=f"{file_hash}-{name}")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Preview not found")
 
 @app.get("/api/folders", response_model=List[schemas.Folder])
-async def list_folders(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Folder))
-    folders = result.scalars().all()
-    return folders
\ No newline at end of file
+async def list_folders(request: Request, db: AsyncSession = Depends(get_db),
+                       cache: ResponseCache = Depends(lambda: app.state.response_cache)):
+    async def load():
+        result = await db.execute(select(models.Folder))
+        return result.scalars().all()
+
+    return await cache.response(request, load, List[schemas.Folder])
+
+@app.get("/api/folders/tree", response_model=List[schemas.FolderNode])
+async def get_folder_tree(request: Request, root_id: Optional[uuid.UUID] = None, db: AsyncSession = Depends(get_db),
+                          cache: ResponseCache = Depends(lambda: app.state.response_cache)):
+    """
+    Nested folder tree (or the subtree under `root_id`) with direct and
+    subtree media counts and sizes, loaded in one query.
+    """
+    return await cache.response(request, lambda: load_folder_tree(db, root_id), List[schemas.FolderNode])
+
+@app.get("/api/folders/{folder_id}/media", response_model=schemas.MediaPage)
+async def list_folder_media(
+    folder_id: uuid.UUID,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+    cache: ResponseCache = Depends(lambda: app.state.response_cache),
+):
+    """Media linked to a folder, newest first, keyset-paginated on (created_at, id)."""
+    async def load():
+        if await db.get(models.Folder, folder_id) is None:
+            raise HTTPException(status_code=404, detail="Folder not found")
+        stmt = (
+            select(models.Media)
+            .join(models.media_folders, models.media_folders.c.media_id == models.Media.id)
+            .where(models.media_folders.c.folder_id == folder_id)
+        )
+        filtered = stmt
+
+        if cursor:
+            stmt = stmt.where(tuple_(models.Media.created_at, models.Media.id) < decode_time_cursor(cursor))
+        stmt = stmt.order_by(models.Media.created_at.desc(), models.Media.id.desc()).limit(limit + 1)
+
+        rows = (await db.execute(stmt)).scalars().all()
+        items = rows[:limit]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if len(rows) > limit else None
+
+        page = schemas.MediaPage.model_validate({"items": items, "next_cursor": next_cursor}, from_attributes=True)
+        if cursor is None:
+            page.total, page.total_is_estimate = await capped_count(db, filtered)
+        return page
+
+    return await cache.response(request, load, schemas.MediaPage)
+
+
+@app.websocket("/ws/jobs")
+async def jobs_progress_ws(websocket: WebSocket, job_ids: Optional[str] = None):
+    """
+    Streams job progress messages. Without `job_ids` (comma-separated) every
+    job is streamed; clients can change their filter by sending
+    {"subscribe": [...]} / {"unsubscribe": [...]} / {"all": true}.
+    """
+    await websocket.accept()
+    hub: ProgressHub = app.state.progress_hub
+    client = hub.register(job_ids.split(',') if job_ids else None)
+
+    async def sender():
+        while True:
+            await websocket.send_text(await client.queue.get())
+
+    async def receiver():
+        while True:
+            command = await websocket.receive_json()
+            if command.get("all"):
+                client.job_ids = None
+            if command.get("subscribe"):
+                client.job_ids = (client.job_ids or set()) | set(command["subscribe"])
+            if command.get("unsubscribe") and client.job_ids is not None:
+                client.job_ids -= set(command["unsubscribe"])
+
+    tasks = [asyncio.create_task(sender()), asyncio.create_task(receiver())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        hub.unregister(client)
@@ -0,0 +1,73 @@
+import time
+
+from arq.connections import ArqRedis
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.responses import Response
+
+from .jobs import DOWNLOAD_QUEUE, job_counts
+
+# Réponses JSON (ms) jusqu'aux streams de fichiers (plusieurs secondes)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_SECONDS = Histogram(
+    "mediafetcher_http_request_seconds", "HTTP request duration, by route template",
+    ["method", "route", "status"], buckets=REQUEST_BUCKETS,
+)
+JOBS_ENQUEUED = Counter("mediafetcher_jobs_enqueued_total", "Download jobs enqueued by the API", ["lane"])
+# Files exportées ici seulement, avec les définitions de /api/jobs/counts (jobs.job_counts)
+QUEUE_DEPTH = Gauge(
+    "mediafetcher_queue_depth", "Jobs waiting for a worker in the arq queue and in each priority lane", ["queue"],
+)
+DEFERRED = Gauge("mediafetcher_jobs_deferred", "Jobs in the arq queue scheduled for later (host limits, retries)")
+IN_FLIGHT = Gauge("mediafetcher_jobs_in_flight", "Download jobs currently running, all workers together")
+CACHE_REQUESTS = Counter(
+    "mediafetcher_response_cache_total", "Cached library reads, by result (hit, miss, not_modified)", ["result"],
+)
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request into REQUEST_SECONDS. Plain ASGI (not
+    BaseHTTPMiddleware) so streamed media responses pass through untouched;
+    the label is the route template, never the raw path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - start)
+
+
+async def collect_queue_metrics(redis_pool: ArqRedis) -> None:
+    """Refreshes the queue gauges from Redis (called on each scrape)."""
+    counts = await job_counts(redis_pool)
+    QUEUE_DEPTH.labels(DOWNLOAD_QUEUE).set(counts["queued"] - sum(counts["lanes"].values()))
+    for lane, size in counts["lanes"].items():
+        QUEUE_DEPTH.labels(lane).set(size)
+    DEFERRED.set(counts["deferred"])
+    IN_FLIGHT.set(counts["in_progress"])
+
+
+async def metrics_response(redis_pool: ArqRedis) -> Response:
+    await collect_queue_metrics(redis_pool)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
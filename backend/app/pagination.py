@@ -0,0 +1,66 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func, literal_column, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Au-delà, le total exact coûterait un scan complet : on renvoie une estimation
+COUNT_CAP = 10_000
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque keyset cursor from the sort key of the last row of a page."""
+    payload = [v.isoformat() if isinstance(v, datetime) else str(v) if isinstance(v, uuid.UUID) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_time_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Decodes a (created_at, id) cursor."""
+    values = decode_cursor(cursor)
+    try:
+        created_at, row_id = values
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, uuid.UUID]:
+    """Decodes a (rank, id) cursor."""
+    values = decode_cursor(cursor)
+    try:
+        rank, row_id = values
+        return float(rank), uuid.UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def capped_count(db: AsyncSession, stmt, table_name: Optional[str] = None) -> Tuple[int, bool]:
+    """
+    Counts the rows of `stmt` up to COUNT_CAP. Past the cap, returns the
+    planner's row estimate for `table_name` (unfiltered listings) or the cap
+    itself. Returns (count, is_estimate).
+    """
+    capped = stmt.with_only_columns(literal_column("1")).order_by(None).limit(COUNT_CAP + 1).subquery()
+    count = (await db.execute(select(func.count()).select_from(capped))).scalar_one()
+    if count <= COUNT_CAP:
+        return count, False
+
+    if table_name:
+        estimate = (await db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :name"), {"name": table_name}
+        )).scalar()
+        if estimate and estimate > COUNT_CAP:
+            return int(estimate), True
+    return COUNT_CAP, True
@@ -0,0 +1,23 @@
+"""
+Content-addressed storage layout, shared by the worker and the backend
+(keep both copies identical).
+
+Files live under NAS_MEDIA_PATH as `<h[0:2]>/<h[2:4]>/<hash><ext>` with the
+default STORAGE_SHARD_DEPTH=2 / STORAGE_SHARD_WIDTH=2; a depth of 0 is the
+old flat layout. `Media.file_path` stores this relative path.
+"""
+from pathlib import Path, PurePosixPath
+
+from .config import settings
+
+
+def media_relpath(file_hash: str, suffix: str) -> str:
+    """Relative path of the file with content hash `file_hash` and extension `suffix`."""
+    width = settings.STORAGE_SHARD_WIDTH
+    shards = [file_hash[i * width:(i + 1) * width] for i in range(settings.STORAGE_SHARD_DEPTH)]
+    return str(PurePosixPath(*shards, f"{file_hash}{suffix}"))
+
+
+def media_abspath(file_path: str, root: str = None) -> Path:
+    """Absolute path of a stored file from its `Media.file_path`."""
+    return Path(root or settings.NAS_MEDIA_PATH) / file_path
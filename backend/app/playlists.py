@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import shutil
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import List, Optional
+
+import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+# Limite les extractions de playlists simultanées lancées par l'API
+EXPANSION_CONCURRENCY = 4
+_expansion_semaphore = asyncio.Semaphore(EXPANSION_CONCURRENCY)
+
+
+def _flat_entries(url: str, cookie_file: Optional[Path]) -> List[str]:
+    with TemporaryDirectory() as tmpdir:
+        # yt-dlp réécrit son fichier de cookies en sortie : on lui donne une copie privée
+        private_cookies = None
+        if cookie_file and cookie_file.exists():
+            private_cookies = Path(tmpdir) / "cookies.txt"
+            shutil.copyfile(cookie_file, private_cookies)
+        opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': 'in_playlist',
+            'skip_download': True,
+            'cookiefile': str(private_cookies) if private_cookies else None,
+        }
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+
+    if not info or info.get('_type') not in ('playlist', 'multi_video'):
+        return [url]
+
+    urls = []
+    for entry in info.get('entries') or []:
+        if not entry:
+            continue
+        entry_url = entry.get('webpage_url') or entry.get('url')
+        if entry_url:
+            urls.append(entry_url)
+    return urls or [url]
+
+
+async def expand_playlist(url: str, cookie_file: Optional[Path] = None) -> List[str]:
+    """
+    Returns the URLs of every entry of a playlist/channel (flat extraction,
+    nothing is downloaded), or `[url]` if it is not a playlist or cannot be
+    expanded.
+    """
+    loop = asyncio.get_running_loop()
+    async with _expansion_semaphore:
+        try:
+            return await loop.run_in_executor(None, _flat_entries, url, cookie_file)
+        except Exception as e:
+            logger.warning(f"Impossible d'étendre la playlist {url}: {e}")
+            return [url]
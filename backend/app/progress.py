@@ -0,0 +1,92 @@
+import asyncio
+import json
+import logging
+from typing import Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Doit correspondre à workers/app/progress.py
+PROGRESS_CHANNEL = "jobs:progress"
+
+CLIENT_QUEUE_SIZE = 256
+
+
+class ProgressClient:
+    """One connected dashboard: a bounded outbox and an optional job filter."""
+
+    def __init__(self, job_ids: Optional[Iterable[str]] = None):
+        self.job_ids: Optional[Set[str]] = set(job_ids) if job_ids else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+
+    def wants(self, job_id: Optional[str]) -> bool:
+        return self.job_ids is None or job_id in self.job_ids
+
+    def push(self, message: str) -> None:
+        # Client lent : on jette le plus ancien message plutôt que de bloquer le hub
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(message)
+
+
+class ProgressHub:
+    """
+    Fans job progress out to WebSocket clients.
+
+    The whole backend holds a single Redis subscription on PROGRESS_CHANNEL,
+    whatever the number of jobs or connected dashboards.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.clients: Set[ProgressClient] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, job_ids: Optional[Iterable[str]] = None) -> ProgressClient:
+        client = ProgressClient(job_ids)
+        self.clients.add(client)
+        return client
+
+    def unregister(self, client: ProgressClient) -> None:
+        self.clients.discard(client)
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _fanout(self, message: str) -> None:
+        try:
+            job_id = json.loads(message).get("job_id")
+        except ValueError:
+            return
+        for client in self.clients:
+            if client.wants(job_id):
+                client.push(message)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(PROGRESS_CHANNEL)
+                try:
+                    async for message in pubsub.listen():
+                        if message.get("type") != "message" or not self.clients:
+                            continue
+                        data = message["data"]
+                        self._fanout(data.decode() if isinstance(data, bytes) else data)
+                finally:
+                    await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Abonnement progression perdu ({e}), reconnexion...")
+                await asyncio.sleep(1)
@@ -1,9 +1,9 @@
 import uuid
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 # =================================
@@ -16,12 +16,40 @@ class MediaType(str, Enum):
     AUDIO = 'AUDIO'
 
 
+class Lane(str, Enum):
+    INTERACTIVE = 'interactive'  # one-click downloads from the extension
+    NORMAL = 'normal'
+    BULK = 'bulk'  # playlist / channel archives
+
+
+class JobState(str, Enum):
+    QUEUED = 'queued'
+    DEFERRED = 'deferred'
+    IN_PROGRESS = 'in_progress'
+    COMPLETE = 'complete'
+    FAILED = 'failed'
+
+
 # =================================
 #         API Input Schemas
 # =================================
 
 class DownloadRequest(BaseModel):
     url: str
+    # File prioritaire ; par défaut interactive (clic depuis l'extension)
+    lane: Optional[Lane] = None
+
+
+class BatchDownloadRequest(BaseModel):
+    urls: List[str]
+    # Étend les playlists/chaînes côté serveur : un job par entrée
+    expand_playlists: bool = False
+    # Par défaut normal, ou bulk quand les playlists sont étendues
+    lane: Optional[Lane] = None
+
+
+class JobStatusRequest(BaseModel):
+    job_ids: List[str]
 
 
 class Cookie(BaseModel):
@@ -29,7 +57,9 @@ class Cookie(BaseModel):
     value: str
     domain: str
     path: str
-    expires: float
+    # Unix time; missing / <= 0 for session cookies. Chrome's extension API calls it expirationDate.
+    expires: Optional[float] = None
+    expirationDate: Optional[float] = None
     httpOnly: bool
     secure: bool
     sameSite: str
@@ -46,6 +76,50 @@ class CookieUpdateRequest(BaseModel):
 class DownloadResponse(BaseModel):
     job_id: str
     status: str = "queued"
+    lane: Optional[Lane] = None
+
+
+class QueuedJob(BaseModel):
+    url: str
+    job_id: str
+
+
+class BatchDownloadResponse(BaseModel):
+    jobs: List[QueuedJob]
+    count: int
+    duplicates: int = 0
+    status: str = "queued"
+    lane: Optional[Lane] = None
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str  # queued | deferred | in_progress | complete | failed | not_found
+    url: Optional[str] = None
+    enqueue_time: Optional[datetime] = None
+    scheduled_time: Optional[datetime] = None
+    start_time: Optional[datetime] = None
+    finish_time: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    progress: Optional[Dict[str, Any]] = None
+    # Set while the job still waits in its priority lane
+    lane: Optional[Lane] = None
+
+
+class JobPage(BaseModel):
+    jobs: List[JobStatus]
+    next_cursor: Optional[int] = None
+
+
+class JobCounts(BaseModel):
+    queued: int = 0
+    deferred: int = 0
+    in_progress: int = 0
+    complete: int = 0
+    failed: int = 0
+    # Jobs waiting in each priority lane (included in `queued`)
+    lanes: Dict[str, int] = Field(default_factory=dict)
 
 
 class CookieUpdateResponse(BaseModel):
@@ -63,14 +137,46 @@ class MediaBase(BaseModel):
     media_type: MediaType
     file_size: int
     source_url: Optional[str] = None
+    extractor: Optional[str] = None
+    extractor_id: Optional[str] = None
+    platform: Optional[str] = None
+    post_index: Optional[int] = None
+    meta: Optional[Dict[str, Any]] = None
+    title: Optional[str] = None
+    uploader: Optional[str] = None
+    duration: Optional[float] = None
+    tags: Optional[List[str]] = None
+    description: Optional[str] = None
 
 
 class Media(MediaBase):
     id: uuid.UUID
     created_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SearchPage(BaseModel):
+    items: List[Media]
+    # Opaque (rank, id) keyset cursor for the next page, None on the last page
+    next_cursor: Optional[str] = None
+
+
+class SimilarMedia(BaseModel):
+    media: Media
+    # Smallest Hamming distance between the 64-bit pHashes of the two media
+    distance: int
+    # Share of the queried media's frames that have a match (1.0 for images)
+    score: float
+
+
+class MediaPage(BaseModel):
+    items: List[Media]
+    # Opaque keyset cursor for the next page, None on the last page
+    next_cursor: Optional[str] = None
+    # Only computed for the first page (no cursor)
+    total: Optional[int] = None
+    total_is_estimate: bool = False
 
 
 class FolderBase(BaseModel):
@@ -82,5 +188,14 @@ class Folder(FolderBase):
     id: uuid.UUID
     created_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class FolderNode(Folder):
+    # Media linked directly to this folder
+    media_count: int = 0
+    total_bytes: int = 0
+    # This folder and all its descendants (a media linked to several of them counts once per link)
+    subtree_media_count: int = 0
+    subtree_bytes: int = 0
+    children: List["FolderNode"] = Field(default_factory=list)
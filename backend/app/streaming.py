@@ -0,0 +1,144 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+CHUNK_SIZE = 1024 * 1024
+# RFC 9110 byte-range-spec / suffix-range (ASCII digits only)
+BYTE_RANGE_RE = re.compile(r"(\d*)-(\d*)", re.ASCII)
+# Fichiers adressés par contenu : une URL donnée ne change jamais de contenu
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single `bytes=` range into inclusive (start, end). Returns None
+    when the header must be ignored and the whole file served (other unit,
+    multiple ranges, invalid syntax, as RFC 9110 requires) and raises
+    ValueError when a valid range cannot be satisfied (416).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    match = BYTE_RANGE_RE.fullmatch(spec.strip())
+    if match is None:
+        return None
+    start_s, end_s = match.groups()
+    if not start_s:
+        if not end_s:
+            return None
+        # bytes=-N : les N derniers octets
+        suffix = int(end_s)
+        if suffix == 0 or size == 0:
+            raise ValueError("unsatisfiable suffix range")
+        return max(size - suffix, 0), size - 1
+    start = int(start_s)
+    if end_s and int(end_s) < start:
+        return None
+    end = int(end_s) if end_s else size - 1
+    if start >= size:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+class MediaFileResponse(Response):
+    """
+    Serves a stored media file with Range/206, ETag and Last-Modified support.
+
+    Only the requested byte range is read (pread from its offset, in worker
+    threads), so seeking in a large video never reads it from the start.
+    When the ASGI server offers `http.response.zerocopysend`, the range is
+    handed to it as an open file (sendfile) instead; uvicorn, which serves
+    the backend image, does not offer it, so there pread is what runs.
+    """
+
+    def __init__(self, path: str, request: Request, etag: str, media_type: Optional[str] = None):
+        self.path = path
+        self.send_header_only = request.method == "HEAD"
+        stat = os.stat(path)
+        self.size = stat.st_size
+        self.etag = f'"{etag}"'
+        self.range: Optional[Tuple[int, int]] = None
+
+        super().__init__(status_code=200, media_type=media_type or mimetypes.guess_type(path)[0] or "application/octet-stream")
+        self.headers.update({
+            "accept-ranges": "bytes",
+            "etag": self.etag,
+            "last-modified": formatdate(stat.st_mtime, usegmt=True),
+            "cache-control": IMMUTABLE_CACHE_CONTROL,
+        })
+        self._evaluate(request, stat.st_mtime)
+
+    def _not_modified(self, request: Request, mtime: float) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            return if_none_match.strip() == "*" or self.etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _evaluate(self, request: Request, mtime: float) -> None:
+        if self._not_modified(request, mtime):
+            self.status_code = 304
+            return
+
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        # If-Range qui ne correspond plus à la version servie : on renvoie le fichier entier
+        if range_header and (if_range is None or if_range.strip() == self.etag):
+            try:
+                self.range = _parse_range(range_header, self.size)
+            except ValueError:
+                self.status_code = 416
+                self.headers["content-range"] = f"bytes */{self.size}"
+                self.headers["content-length"] = "0"
+                return
+
+        if self.range:
+            start, end = self.range
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end}/{self.size}"
+            self.headers["content-length"] = str(end - start + 1)
+        else:
+            self.headers["content-length"] = str(self.size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only or self.status_code in (304, 416) or self.size == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        start, end = self.range or (0, self.size - 1)
+        count = end - start + 1
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            # Le serveur fait le sendfile lui-même depuis l'objet fichier
+            with await anyio.to_thread.run_sync(open, self.path, "rb") as file:
+                await send({"type": "http.response.zerocopysend", "file": file, "offset": start, "count": count})
+            return
+
+        fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            offset = start
+            remaining = count
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(os.pread, fd, min(CHUNK_SIZE, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # Fichier tronqué entre-temps : on termine proprement le corps
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(fd)
@@ -0,0 +1,110 @@
+import ipaddress
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Paramètres de tracking ajoutés par les plateformes / l'extension : ils ne
+# changent pas le média pointé, on les retire pour la déduplication.
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "igshid", "igsh", "si", "feature", "ref", "ref_src",
+    "ref_url", "s", "t", "share_id", "utm_id", "_r", "_t", "is_from_webapp",
+    "sender_device", "mibextid",
+}
+
+# Sous-domaines "miroirs" qui servent le même contenu que le domaine nu.
+MIRROR_PREFIXES = ("www.", "m.", "mobile.")
+
+
+def normalize_url(url: str) -> str:
+    """
+    Returns a canonical form of `url` used as the dedup key:
+    lowercase scheme/host, no mirror prefix, no fragment, no tracking
+    parameters, sorted query string and no trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    if scheme == "http":
+        scheme = "https"
+
+    host = (parts.hostname or "").lower()
+    for prefix in MIRROR_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/") or ""
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+# Domaines alternatifs d'une même plateforme (mêmes limites de débit)
+HOST_ALIASES = {
+    "youtu.be": "youtube.com",
+    "x.com": "twitter.com",
+    "fxtwitter.com": "twitter.com",
+    "vxtwitter.com": "twitter.com",
+    "instagr.am": "instagram.com",
+    "redd.it": "reddit.com",
+}
+
+
+# Suffixes publics à deux labels : le site est le label juste avant
+# (`bbc.co.uk`, pas `co.uk`). Extrait de la Public Suffix List, limité aux
+# pays d'où viennent des médias ; ajouter ici si un site se retrouve groupé
+# avec tous les autres de son pays.
+MULTI_LABEL_SUFFIXES = {
+    "co.uk", "org.uk", "me.uk", "ac.uk", "gov.uk", "ltd.uk", "plc.uk",
+    "com.au", "net.au", "org.au", "edu.au", "gov.au",
+    "co.nz", "net.nz", "org.nz",
+    "co.jp", "ne.jp", "or.jp", "ac.jp", "go.jp",
+    "co.kr", "or.kr", "ne.kr",
+    "com.br", "net.br", "org.br",
+    "com.mx", "com.ar", "com.co", "com.pe", "com.ve",
+    "com.cn", "net.cn", "org.cn", "com.hk", "com.tw", "com.sg", "com.my",
+    "com.ph", "com.vn", "co.th", "co.id", "co.in", "net.in", "org.in",
+    "com.tr", "com.ua", "com.pl", "co.il", "co.za", "com.eg", "com.sa",
+}
+
+
+def _ip_literal(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+def _suffix_length(labels: list) -> int:
+    """Number of labels of the public suffix ending `labels`."""
+    return 2 if ".".join(labels[-2:]) in MULTI_LABEL_SUFFIXES else 1
+
+
+def host_key(url: str) -> str:
+    """
+    Returns the site a URL belongs to, used to group jobs per platform
+    (e.g. `https://vm.tiktok.com/x` -> `tiktok.com`, `https://www.bbc.co.uk/x`
+    -> `bbc.co.uk`). IP addresses are returned unchanged.
+    """
+    host = (urlsplit(url.strip()).hostname or "").lower().rstrip(".")
+    if _ip_literal(host):
+        return host
+    labels = host.split(".")
+    keep = _suffix_length(labels) + 1
+    if len(labels) > keep:
+        host = ".".join(labels[-keep:])
+    return HOST_ALIASES.get(host, host)
+
+
+def platform_for(url: str) -> str:
+    """Platform key stored on `Media.platform` (`youtube`, `twitter`, `tiktok`...)."""
+    host = host_key(url)
+    if _ip_literal(host):
+        return host
+    labels = host.split(".")
+    suffix = _suffix_length(labels)
+    return ".".join(labels[:-suffix]) if len(labels) > suffix else host
@@ -0,0 +1,26 @@
+import uuid
+from datetime import datetime, timezone
+
+from app import models
+
+from test_media import make_media
+
+
+def test_list_folder_media_returns_rows(client, db):
+    folder = models.Folder(id=uuid.uuid4(), name="Clips", created_at=datetime(2026, 1, 1, tzinfo=timezone.utc))
+    db.objects[(models.Folder, folder.id)] = folder
+    rows = [make_media(1), make_media(2, media_type="IMAGE")]
+    db.queue(rows, len(rows))
+
+    response = client.get(f"/api/folders/{folder.id}/media")
+
+    assert response.status_code == 200
+    page = response.json()
+    assert [item["id"] for item in page["items"]] == [str(m.id) for m in rows]
+    assert page["items"][1]["media_type"] == "IMAGE"
+    assert page["total"] == 2
+
+
+def test_list_folder_media_unknown_folder(client, db):
+    response = client.get(f"/api/folders/{uuid.uuid4()}/media")
+    assert response.status_code == 404
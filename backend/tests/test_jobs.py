@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from arq.connections import ArqRedis
+from arq.constants import in_progress_key_prefix, result_key_prefix
+from arq.jobs import serialize_result
+from arq.utils import timestamp_ms
+
+from app.jobs import (
+    DOWNLOAD_QUEUE, FINISHED_KEY_PREFIX, JOB_COUNTS_KEY, enqueue_jobs, job_counts, lane_key, list_jobs,
+)
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def make_pool() -> ArqRedis:
+    return ArqRedis(connection_pool=fakeredis.FakeAsyncRedis().connection_pool)
+
+
+async def start_jobs(pool: ArqRedis, count: int, running: int):
+    """`count` jobs moved to the arq queue, the first `running` of them taken by a worker."""
+    ids = await enqueue_jobs(pool, "download_media_task", [(f"https://example.com/{i}",) for i in range(count)])
+    for job_id in ids[:running]:
+        await pool.set(in_progress_key_prefix + job_id, b"1")
+    return ids
+
+
+def test_counts_do_not_report_running_jobs_as_queued():
+    async def scenario():
+        pool = await make_pool()
+        await start_jobs(pool, 5, running=3)
+        await enqueue_jobs(pool, "download_media_task", [("https://example.com/lane",)], lane="bulk")
+        await pool.hset(JOB_COUNTS_KEY, mapping={"complete": 7, "failed": 2})
+        # Un résultat stocké n'est plus relu pour les compteurs
+        await pool.set(result_key_prefix + "old", b"not a result")
+
+        counts = await job_counts(pool)
+        assert counts["queued"] == 2 + 1
+        assert counts["in_progress"] == 3
+        assert counts["lanes"] == {"interactive": 0, "normal": 0, "bulk": 1}
+        assert (counts["complete"], counts["failed"]) == (7, 2)
+
+    run(scenario())
+
+
+def test_queued_pages_skip_running_jobs():
+    async def scenario():
+        pool = await make_pool()
+        ids = await start_jobs(pool, 6, running=4)
+        lane_ids = await enqueue_jobs(pool, "download_media_task", [(f"https://example.com/l{i}",) for i in range(3)],
+                                      lane="normal")
+
+        first, cursor = await list_jobs(pool, "queued", 0, 3)
+        second, last_cursor = await list_jobs(pool, "queued", cursor, 3)
+        assert (len(first), len(second)) == (3, 2)
+        # Jobs d'un même lot : même score, ordre des ids aléatoire
+        assert {j["job_id"] for j in first[:2]} == set(ids[4:])
+        assert {j["job_id"] for j in first[2:] + second} == set(lane_ids)
+        assert last_cursor is None
+
+    run(scenario())
+
+
+def test_other_queues_jobs_are_not_listed():
+    async def scenario():
+        pool = await make_pool()
+        ids = await start_jobs(pool, 2, running=1)
+        # Job de transcodage en cours : clés arq globales, mais file arq:transcode
+        await pool.set(in_progress_key_prefix + "transcode:h264_mp4:abc", b"1")
+        await pool.zadd("arq:transcode", {"transcode:h264_mp4:abc": 1})
+
+        running, cursor = await list_jobs(pool, "in_progress", 0, 50)
+        assert [j["job_id"] for j in running] == [ids[0]]
+        assert cursor is None
+        assert (await job_counts(pool))["in_progress"] == 1
+
+    run(scenario())
+
+
+def test_finished_jobs_are_paged_most_recent_first():
+    async def scenario():
+        pool = await make_pool()
+        now = timestamp_ms()
+        for i in range(3):
+            job_id = f"done{i}"
+            await pool.set(result_key_prefix + job_id, serialize_result(
+                "download_media_task", (f"https://example.com/{i}",), {}, 1, now, True,
+                {"status": "success"}, now, now, job_id, "arq:queue", job_id))
+            await pool.zadd(FINISHED_KEY_PREFIX + "complete", {job_id: now + i})
+        await pool.set(result_key_prefix + "transcode:h264_mp4:abc", b"not listed")
+
+        first, cursor = await list_jobs(pool, "complete", 0, 2)
+        second, last_cursor = await list_jobs(pool, "complete", cursor, 2)
+        assert [j["job_id"] for j in first + second] == ["done2", "done1", "done0"]
+        assert first[0]["url"] == "https://example.com/2"
+        assert last_cursor is None
+
+    run(scenario())
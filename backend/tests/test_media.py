@@ -0,0 +1,80 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app import models
+
+
+def make_media(n: int, **fields) -> models.Media:
+    values = dict(
+        id=uuid.uuid4(),
+        file_hash=f"{n:064x}",
+        file_path=f"00/00/{n:064x}.mp4",
+        media_type="VIDEO",
+        file_size=1000 + n,
+        platform="youtube",
+        title=f"Video {n}",
+        tags=["a", "b"],
+        meta={"num": n},
+        created_at=datetime(2026, 1, 1, tzinfo=timezone.utc) - timedelta(minutes=n),
+    )
+    values.update(fields)
+    return models.Media(**values)
+
+
+def test_list_media_returns_rows(client, db):
+    rows = [make_media(1), make_media(2)]
+    db.queue(rows, len(rows))
+
+    response = client.get("/api/media")
+
+    assert response.status_code == 200
+    page = response.json()
+    assert [item["id"] for item in page["items"]] == [str(m.id) for m in rows]
+    assert page["items"][0]["title"] == "Video 1"
+    assert page["items"][0]["meta"] == {"num": 1}
+    assert page["next_cursor"] is None
+    assert page["total"] == 2
+
+
+def test_list_media_next_cursor(client, db):
+    rows = [make_media(n) for n in range(3)]
+    db.queue(rows, len(rows))
+
+    page = client.get("/api/media", params={"limit": 2}).json()
+    assert [item["id"] for item in page["items"]] == [str(m.id) for m in rows[:2]]
+    assert page["next_cursor"]
+
+
+def test_search_returns_rows(client, db):
+    hits = [make_media(1), make_media(2)]
+    db.queue([SimpleNamespace(Media=m, rank=1.0 / (i + 1)) for i, m in enumerate(hits)])
+
+    response = client.get("/api/search", params={"q": "video"})
+
+    assert response.status_code == 200
+    page = response.json()
+    assert [item["id"] for item in page["items"]] == [str(m.id) for m in hits]
+    assert page["next_cursor"] is None
+
+
+def test_similar_media_returns_matches(client, db):
+    query, match = make_media(1), make_media(2)
+    db.objects[(models.Media, query.id)] = query
+    db.queue(
+        [0x0F0F0F0F0F0F0F0F],  # pHashes of the queried media
+        [(match.id, 2, 1.0)],  # find_similar
+        [match],
+    )
+
+    response = client.get(f"/api/media/{query.id}/similar")
+
+    assert response.status_code == 200
+    [similar] = response.json()
+    assert similar["media"]["id"] == str(match.id)
+    assert (similar["distance"], similar["score"]) == (2, 1.0)
+
+
+def test_similar_media_refuses_distances_past_exact_recall(client, db):
+    response = client.get(f"/api/media/{uuid.uuid4()}/similar", params={"max_distance": 12})
+    assert response.status_code == 422
@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+from arq.connections import ArqRedis
+from arq.constants import in_progress_key_prefix
+
+from app.jobs import DOWNLOAD_QUEUE, enqueue_jobs
+from app.metrics import DEFERRED, IN_FLIGHT, QUEUE_DEPTH, collect_queue_metrics
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def test_queue_gauges_match_job_counts():
+    async def scenario():
+        pool = ArqRedis(connection_pool=fakeredis.FakeAsyncRedis().connection_pool)
+        ids = await enqueue_jobs(pool, "download_media_task", [(f"https://example.com/{i}",) for i in range(4)])
+        for job_id in ids[:3]:
+            await pool.set(in_progress_key_prefix + job_id, b"1")
+        await enqueue_jobs(pool, "download_media_task", [("https://example.com/l",)], lane="bulk")
+        # Job de transcodage en cours : pas un téléchargement
+        await pool.set(in_progress_key_prefix + "transcode:h264_mp4:abc", b"1")
+
+        await collect_queue_metrics(pool)
+
+    asyncio.run(scenario())
+    assert QUEUE_DEPTH.labels(DOWNLOAD_QUEUE)._value.get() == 1
+    assert QUEUE_DEPTH.labels("bulk")._value.get() == 1
+    assert IN_FLIGHT._value.get() == 3
+    assert DEFERRED._value.get() == 0
@@ -0,0 +1,70 @@
+import pytest
+
+from app.config import settings
+from app.streaming import _parse_range
+
+FILE_HASH = "ab" * 32
+BODY = bytes(range(256)) * 4
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=1000-", (1000, 1023)),
+    ("bytes=1000-5000", (1000, 1023)),
+    ("bytes=-24", (1000, 1023)),
+    ("bytes=-5000", (0, 1023)),
+    # Ignorés : fichier entier (RFC 9110)
+    ("bytes=5-3", None),
+    ("bytes=abc", None),
+    ("bytes=-", None),
+    ("bytes=+1-2", None),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+])
+def test_parse_range(header, expected):
+    assert _parse_range(header, len(BODY)) == expected
+
+
+@pytest.mark.parametrize("header, size", [("bytes=1024-", 1024), ("bytes=-0", 1024), ("bytes=-10", 0), ("bytes=0-", 0)])
+def test_parse_range_unsatisfiable(header, size):
+    with pytest.raises(ValueError):
+        _parse_range(header, size)
+
+
+@pytest.fixture
+def preview(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "NAS_MEDIA_PATH", str(tmp_path))
+    directory = tmp_path / ".previews" / FILE_HASH[:2] / FILE_HASH
+    directory.mkdir(parents=True)
+
+    def write(body: bytes) -> str:
+        (directory / "poster.jpg").write_bytes(body)
+        return f"/api/previews/{FILE_HASH}/poster.jpg"
+
+    return write
+
+
+def test_range_request(client, preview):
+    response = client.get(preview(BODY), headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 10-19/1024"
+    assert response.content == BODY[10:20]
+
+
+def test_invalid_range_serves_whole_file(client, preview):
+    response = client.get(preview(BODY), headers={"Range": "bytes=oops"})
+    assert response.status_code == 200
+    assert "content-range" not in response.headers
+    assert response.content == BODY
+
+
+def test_unsatisfiable_range(client, preview):
+    response = client.get(preview(BODY), headers={"Range": "bytes=2048-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */1024"
+
+
+def test_suffix_range_on_empty_file(client, preview):
+    response = client.get(preview(b""), headers={"Range": "bytes=-10"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */0"
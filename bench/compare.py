@@ -0,0 +1,47 @@
+"""
+Compares two benchmark reports written by bench/run.py.
+
+    python bench/compare.py before.json after.json
+
+Prints every numeric value present in both reports with its relative change.
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+
+def flatten(report: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    values: Dict[str, float] = {}
+    for key, value in report.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            values.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    args = parser.parse_args()
+
+    before = json.loads(args.before.read_text())
+    after = json.loads(args.after.read_text())
+    old, new = flatten(before), flatten(after)
+    # La config n'est pas un résultat : seulement signalée si elle diffère
+    for name in sorted(k for k in old.keys() & new.keys() if k.startswith("config.") and old[k] != new[k]):
+        print(f"⚠️ {name}: {old[name]} -> {new[name]}")
+
+    width = max((len(k) for k in old.keys() & new.keys()), default=0)
+    for name in sorted(old.keys() & new.keys()):
+        if name.startswith("config."):
+            continue
+        change = f"{(new[name] - old[name]) / old[name] * 100:+.1f}%" if old[name] else ""
+        print(f"{name:<{width}}  {old[name]:>12}  {new[name]:>12}  {change}")
+
+
+if __name__ == "__main__":
+    main()
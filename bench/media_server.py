@@ -0,0 +1,167 @@
+"""
+Stand-in media site for the benchmarks: serves synthetic files over HTTP on
+127.0.0.1, with a per-request latency and a per-connection bandwidth cap.
+It runs in its own process so serving never competes with the worker for
+the GIL.
+
+    /media/<id>.<ext>?size=N       N bytes of random data (every file is unique)
+    /api/watch/<id>?size=N         JSON info used by the yt-dlp plugin
+    /gallery/<id>?count=C&size=N   HTML page (yt-dlp has no extractor for it)
+    /api/gallery/<id>?count=C&size=N  JSON file list used by the gallery-dl shim
+"""
+import json
+import multiprocessing
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+from urllib.parse import parse_qs, urlparse
+
+CHUNK_SIZE = 64 * 1024
+# Données aléatoires générées une fois, servies en boucle derrière un en-tête propre à chaque fichier
+FILLER_SIZE = 16 * CHUNK_SIZE
+
+CONTENT_TYPES = {".mp4": "video/mp4", ".jpg": "image/jpeg"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._route(send_body=False)
+
+    def do_GET(self):
+        self._route(send_body=True)
+
+    def _route(self, send_body: bool) -> None:
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+        size = int(query.get("size", 1024 * 1024))
+        count = int(query.get("count", 1))
+        base = f"http://{self.headers.get('Host')}"
+
+        if parts[0] == "media" and len(parts) == 2:
+            self._send_media(parts[1], size, send_body)
+        elif parts[:2] == ["api", "watch"] and len(parts) == 3:
+            self._send_json({
+                "id": parts[2],
+                "title": f"Bench video {parts[2]}",
+                "url": f"{base}/media/{parts[2]}.mp4?size={size}",
+                "filesize": size,
+            }, send_body)
+        elif parts[:2] == ["api", "gallery"] and len(parts) == 3:
+            self._send_json([
+                {"num": i + 1, "url": f"{base}/media/{parts[2]}-{i + 1}.jpg?size={size}", "filesize": size}
+                for i in range(count)
+            ], send_body)
+        elif parts[0] == "gallery" and len(parts) == 2:
+            body = f"<html><head><title>Gallery {parts[1]}</title></head><body></body></html>".encode()
+            self._send_headers(200, "text/html", len(body))
+            if send_body:
+                self.wfile.write(body)
+        else:
+            self._send_headers(404, "text/plain", 0)
+
+    def _send_headers(self, status: int, content_type: str, length: int) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(length))
+        self.end_headers()
+
+    def _send_json(self, payload, send_body: bool) -> None:
+        body = json.dumps(payload).encode()
+        self._send_headers(200, "application/json", len(body))
+        if send_body:
+            self.wfile.write(body)
+
+    def _chunks(self, name: str, size: int) -> Iterator[bytes]:
+        filler = self.server.filler
+        header = f"{name}:{time.time_ns()}\n".encode()
+        data = header + filler[:CHUNK_SIZE - len(header)]
+        sent = 0
+        while sent < size:
+            chunk = data[:size - sent]
+            yield chunk
+            sent += len(chunk)
+            offset = sent % FILLER_SIZE
+            data = filler[offset:offset + CHUNK_SIZE]
+
+    def _send_media(self, name: str, size: int, send_body: bool) -> None:
+        content_type = CONTENT_TYPES.get(os.path.splitext(name)[1], "application/octet-stream")
+        self._send_headers(200, content_type, size)
+        if not send_body:
+            return
+        bandwidth = self.server.bandwidth
+        start = time.perf_counter()
+        sent = 0
+        for chunk in self._chunks(name, size):
+            self.wfile.write(chunk)
+            sent += len(chunk)
+            if bandwidth:
+                # En avance sur le débit cible : on attend que le temps rattrape les octets envoyés
+                ahead = sent / bandwidth - (time.perf_counter() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    latency: float = 0.0
+    bandwidth: float = 0.0
+    filler: bytes = b""
+
+
+def _serve(latency: float, bandwidth: float, port: int, ready) -> None:
+    server = _Server(("127.0.0.1", port), _Handler)
+    server.latency = latency
+    server.bandwidth = bandwidth
+    server.filler = os.urandom(FILLER_SIZE)
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+class MediaServer:
+    """
+    The HTTP server in a child process. `latency` (seconds) is added before
+    every response, `bandwidth` (bytes/s, 0 = unlimited) caps each media
+    transfer.
+    """
+
+    def __init__(self, latency: float = 0.0, bandwidth: float = 0.0, port: int = 0):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.port = port
+        self._process = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def video_url(self, media_id: str, size: int) -> str:
+        return f"{self.base_url}/watch/{media_id}?size={size}"
+
+    def gallery_url(self, media_id: str, count: int, size: int) -> str:
+        return f"{self.base_url}/gallery/{media_id}?count={count}&size={size}"
+
+    def start(self) -> "MediaServer":
+        context = multiprocessing.get_context("spawn")
+        ready = context.Queue()
+        self._process = context.Process(
+            target=_serve, args=(self.latency, self.bandwidth, self.port, ready), daemon=True,
+        )
+        self._process.start()
+        self.port = ready.get(timeout=30)
+        return self
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
@@ -0,0 +1,35 @@
+"""
+yt-dlp extractor for the benchmark media server (bench/media_server.py).
+
+Loaded by yt-dlp as a plugin when bench/ is on sys.path: the worker then
+probes and downloads `/watch/<id>` URLs through its normal code path.
+"""
+from urllib.parse import urlparse
+
+from yt_dlp.extractor.common import InfoExtractor
+
+
+class BenchMediaIE(InfoExtractor):
+    IE_NAME = 'benchmedia'
+    _VALID_URL = r'https?://127\.0\.0\.1:\d+/watch/(?P<id>[\w-]+)'
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        parsed = urlparse(url)
+        info = self._download_json(
+            f'{parsed.scheme}://{parsed.netloc}/api/watch/{video_id}?{parsed.query}', video_id)
+        return {
+            'id': video_id,
+            'title': info['title'],
+            'uploader': 'bench',
+            'duration': 60,
+            'tags': ['bench'],
+            'formats': [{
+                'format_id': 'mp4',
+                'url': info['url'],
+                'ext': 'mp4',
+                'vcodec': 'avc1.640028',
+                'acodec': 'mp4a.40.2',
+                'filesize': info['filesize'],
+            }],
+        }
@@ -0,0 +1,123 @@
+"""
+Fills the searchable metadata (title, uploader, duration, tags, description)
+of media ingested before it was stored.
+
+    python -m app.backfill_metadata [--batch-size 100] [--concurrency 4] [--pause 1.0]
+
+Rows without a title are walked by id (keyset). Files with stored gallery-dl
+metadata (`Media.meta`) are filled without any network access; the others
+are re-extracted with yt-dlp (metadata only, no download), once per source
+URL, through the per-host scheduler so sites see the same limits as during
+downloads. Batches are separated by `--pause` seconds. Safe to interrupt and
+re-run.
+"""
+import argparse
+import asyncio
+import logging
+import uuid
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, Optional
+
+import yt_dlp
+from redis.asyncio import Redis
+from sqlalchemy import select, update
+
+from .cache import bump_library_version
+from .config import settings
+from .database import AsyncSessionLocal
+from .cookies import job_cookie_file
+from .metadata import gallery_fields, ytdlp_fields
+from .models import Media
+from .scheduler import HostScheduler
+from .urls import host_key
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _extract(url: str) -> Dict[str, Any]:
+    with TemporaryDirectory() as tmpdir:
+        cookie_file = job_cookie_file(url, Path(tmpdir))
+        opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'noplaylist': True,
+            'cookiefile': str(cookie_file) if cookie_file else None,
+        }
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            return ydl.extract_info(url, download=False, process=False)
+
+
+async def fetch_fields(scheduler: HostScheduler, url: str) -> Optional[Dict[str, Any]]:
+    host = host_key(url)
+    token = f"backfill:{uuid.uuid4()}"
+    while True:
+        delay = await scheduler.acquire(host, token)
+        if not delay:
+            break
+        await asyncio.sleep(delay)
+    try:
+        info = await asyncio.get_running_loop().run_in_executor(None, _extract, url)
+        return ytdlp_fields(info)
+    except Exception as e:
+        logger.warning(f"⚠️ Métadonnées indisponibles pour {url}: {e}")
+        return None
+    finally:
+        await scheduler.release(host, token)
+
+
+async def backfill(batch_size: int, concurrency: int, pause: float) -> None:
+    redis = Redis.from_url(settings.REDIS_URL)
+    scheduler = HostScheduler(redis)
+    semaphore = asyncio.Semaphore(concurrency)
+    filled = 0
+
+    async def fields_for_url(url: str) -> Optional[Dict[str, Any]]:
+        async with semaphore:
+            return await fetch_fields(scheduler, url)
+
+    last_id = None
+    try:
+        while True:
+            stmt = select(Media).where(Media.title.is_(None)).order_by(Media.id).limit(batch_size)
+            if last_id is not None:
+                stmt = stmt.where(Media.id > last_id)
+            async with AsyncSessionLocal() as session:
+                batch = (await session.execute(stmt)).scalars().all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            # Une seule extraction par URL (les fichiers d'un même post la partagent)
+            urls = sorted({m.source_url for m in batch if m.meta is None and m.source_url})
+            by_url = dict(zip(urls, await asyncio.gather(*(fields_for_url(u) for u in urls))))
+
+            changes = []
+            for media in batch:
+                fields = gallery_fields(media.meta) if media.meta is not None else by_url.get(media.source_url)
+                if fields and fields.get("title"):
+                    changes.append({"id": media.id, **fields})
+            if changes:
+                async with AsyncSessionLocal() as session:
+                    await session.execute(update(Media), changes)
+                    await session.commit()
+                await bump_library_version(redis)
+            filled += len(changes)
+            logger.info(f"🔎 {filled} media complétés (dernier id: {last_id})")
+            await asyncio.sleep(pause)
+    finally:
+        await redis.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--pause", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size, args.concurrency, args.pause))
+
+
+if __name__ == "__main__":
+    main()
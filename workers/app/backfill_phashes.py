@@ -0,0 +1,80 @@
+"""
+Computes missing perceptual hashes for media already in the library.
+
+    python -m app.backfill_phashes [--batch-size 200] [--concurrency N] [--recompute]
+
+Rows are walked by id (keyset), media that already have hashes are skipped
+(with --recompute their hashes are replaced, e.g. after a change of the
+sampled video frames), the rest is processed in parallel in the preview
+process pool. Safe to interrupt and re-run.
+"""
+import argparse
+import asyncio
+import logging
+
+from redis.asyncio import Redis
+from sqlalchemy import delete, select
+
+from .cache import bump_library_version
+from .config import settings
+from .database import AsyncSessionLocal
+from .models import Media, MediaPHash
+from .preview_pool import build_phashes, create_preview_pool
+from .similarity import store_phashes
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def backfill(batch_size: int, concurrency: int, recompute: bool) -> None:
+    pool = create_preview_pool()
+    redis = Redis.from_url(settings.REDIS_URL)
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def process(media: Media) -> None:
+        nonlocal done
+        async with semaphore:
+            frames = await build_phashes(pool, media.file_path, media.media_type)
+        if frames:
+            async with AsyncSessionLocal() as session:
+                if recompute:
+                    await session.execute(delete(MediaPHash).where(MediaPHash.media_id == media.id))
+                await store_phashes(session, media.id, frames)
+                await session.commit()
+            done += 1
+
+    last_id = None
+    try:
+        while True:
+            stmt = select(Media).where(Media.media_type.in_(("VIDEO", "IMAGE"))).order_by(Media.id).limit(batch_size)
+            if last_id is not None:
+                stmt = stmt.where(Media.id > last_id)
+            async with AsyncSessionLocal() as session:
+                batch = (await session.execute(stmt)).scalars().all()
+                if not batch:
+                    break
+                indexed = set() if recompute else set((await session.execute(
+                    select(MediaPHash.media_id).where(MediaPHash.media_id.in_([m.id for m in batch])).distinct()
+                )).scalars().all())
+            last_id = batch[-1].id
+
+            await asyncio.gather(*(process(m) for m in batch if m.id not in indexed))
+            await bump_library_version(redis)
+            logger.info(f"🔍 {done} media indexés (dernier id: {last_id})")
+    finally:
+        pool.shutdown()
+        await redis.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=settings.PREVIEW_WORKERS)
+    parser.add_argument("--recompute", action="store_true", help="replace existing hashes")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size, args.concurrency, args.recompute))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Generates missing previews for media already in the library.
+
+    python -m app.backfill_previews [--batch-size 200] [--concurrency N]
+
+Rows are walked by id (keyset), files whose preview folder already exists
+are skipped, the rest is processed in parallel in the preview process pool.
+Safe to interrupt and re-run.
+"""
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import select
+
+from .config import settings
+from .database import AsyncSessionLocal
+from .models import Media
+from .preview_pool import build_previews, create_preview_pool
+from .previews import preview_dir
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def backfill(batch_size: int, concurrency: int) -> None:
+    pool = create_preview_pool()
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def process(media: Media) -> None:
+        nonlocal done
+        async with semaphore:
+            await build_previews(pool, media.file_hash, media.file_path, media.media_type)
+            done += 1
+
+    last_id = None
+    try:
+        while True:
+            stmt = select(Media).where(Media.media_type.in_(("VIDEO", "IMAGE"))).order_by(Media.id).limit(batch_size)
+            if last_id is not None:
+                stmt = stmt.where(Media.id > last_id)
+            async with AsyncSessionLocal() as session:
+                batch = (await session.execute(stmt)).scalars().all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            todo = [m for m in batch if not (preview_dir(settings.NAS_MEDIA_PATH, m.file_hash) / "thumb.webp").exists()]
+            await asyncio.gather(*(process(m) for m in todo))
+            logger.info(f"🖼️ {done} previews générées (dernier id: {last_id})")
+    finally:
+        pool.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=settings.PREVIEW_WORKERS)
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
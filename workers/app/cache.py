@@ -0,0 +1,18 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Doit correspondre à backend/app/cache.py
+LIBRARY_VERSION_KEY = "library:version"
+
+
+async def bump_library_version(redis) -> None:
+    """
+    Invalidates every library read cached by the API (backend/app/cache.py).
+    Call it after the commit, never before: a read that sees the new version
+    must also see the new rows.
+    """
+    try:
+        await redis.incr(LIBRARY_VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"Version de la bibliothèque non incrémentée ({e}), le cache de l'API expirera seul.")
@@ -1,9 +1,95 @@
+from typing import Dict, List
+
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     DATABASE_URL: str
     REDIS_URL: str # Corrected to match docker-compose.yml
     NAS_MEDIA_PATH: str = "/media/final"
+    # Fan-out of the content-addressed layout (see paths.py): ab/cd/<hash>.ext
+    STORAGE_SHARD_DEPTH: int = 2
+    STORAGE_SHARD_WIDTH: int = 2
+    # Cookie jar written by the backend: cookies.txt + one sites/<site>.txt per site
+    COOKIE_DIR: str = "/data/cookies"
+    # Local scratch disk used while downloading/merging, before the single copy to the NAS
+    STAGING_PATH: str = "/tmp/mediafetcher"
+    # Below this much free space on STAGING_PATH, jobs stage directly on the NAS
+    STAGING_MIN_FREE_BYTES: int = 2 * 1024 ** 3
+
+    # Pre-download dedup: how long URL / extractor-id lookups stay cached in Redis (seconds)
+    DEDUP_CACHE_TTL: int = 7 * 24 * 3600
+    # TTL of cached yt-dlp info dicts (seconds). Format URLs expire, keep it short; 0 disables.
+    INFO_CACHE_TTL: int = 900
+
+    # Job progress published to Redis pub/sub: min seconds between two updates, TTL of the last state
+    PROGRESS_INTERVAL: float = 0.25
+    PROGRESS_TTL: int = 24 * 3600
+
+    # Size of the process pool generating posters/thumbnails/sprites
+    PREVIEW_WORKERS: int = 2
+
+    # Perceptual near-duplicates (see similarity.py). When NEAR_DUPLICATE_SKIP is on,
+    # a new file whose frames match an existing media this closely is not ingested.
+    NEAR_DUPLICATE_SKIP: bool = False
+    # Hamming distance between 64-bit pHashes, at most similarity.MAX_DISTANCE (exact recall of the index)
+    NEAR_DUPLICATE_MAX_DISTANCE: int = Field(6, ge=0, le=11)
+    NEAR_DUPLICATE_MIN_MATCH: float = 0.8  # share of the frames that must match (videos)
+
+    # Transcode worker (arq:transcode queue). 0 = one job per TRANSCODE_THREADS CPUs
+    TRANSCODE_MAX_JOBS: int = 0
+    TRANSCODE_THREADS: int = 2
+    TRANSCODE_TIMEOUT: int = 6 * 3600
+
+    # Learned yt-dlp / gallery-dl routing (see routing.py)
+    ROUTING_HALF_LIFE: int = 7 * 24 * 3600  # outcomes lose half their weight after this (seconds)
+    ROUTING_MIN_SAMPLES: float = 3  # decayed outcomes needed before a route overrides the default
+    ROUTING_TTL: int = 60 * 24 * 3600
+
+    # Warm tools (see ytdlp_pool.py, gallery_dl_helper.py): idle YoutubeDL instances
+    # kept between jobs, extractors instantiated at startup, long-lived gallery-dl
+    # helper processes (0 = one gallery-dl CLI process per job)
+    YTDLP_POOL_IDLE: int = 10
+    YTDLP_PRELOAD_EXTRACTORS: List[str] = ["Youtube", "TikTok", "Twitter", "Instagram", "Generic"]
+    GALLERY_DL_HELPERS: int = 2
+
+    # Postgres connection pool (per worker process)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800  # seconds; under typical proxy/NAT idle timeouts
+
+    # Write-behind buffer for new media rows (see ingest.py)
+    MEDIA_WRITE_BUFFER: bool = False
+    MEDIA_WRITE_BATCH_SIZE: int = 100
+    MEDIA_WRITE_FLUSH_INTERVAL: float = 0.05
+
+    # Prometheus metrics (see metrics.py), served by each worker process
+    METRICS_PORT: int = 9100  # 0 = disabled
+
+    # arq worker
+    WORKER_MAX_JOBS: int = 10
+    JOB_TIMEOUT: int = 300
+
+    # Priority lanes (see lanes.py): share of the download slots each lane gets
+    # while several have work waiting, and how many ready jobs arq:queue holds
+    # on top of the running ones (the last LANE_INTERACTIVE_RESERVE of them
+    # only for interactive jobs)
+    LANE_WEIGHTS: Dict[str, int] = {"interactive": 8, "normal": 3, "bulk": 1}
+    LANE_QUEUE_DEPTH: int = 10
+    LANE_INTERACTIVE_RESERVE: int = 2
+    LANE_DISPATCH_INTERVAL: float = 0.2
+
+    # Per-host scheduling, shared by all worker processes through Redis.
+    # Keys are sites as returned by urls.host_key; dicts are JSON in the env.
+    HOST_CONCURRENCY: Dict[str, int] = {"tiktok.com": 2, "instagram.com": 2, "twitter.com": 3}
+    HOST_CONCURRENCY_DEFAULT: int = 4  # 0 = unlimited
+    HOST_RATE_LIMITS: Dict[str, float] = {"tiktok.com": 0.5, "instagram.com": 0.2}  # job starts per second
+    HOST_RATE_LIMIT_DEFAULT: float = 0  # 0 = unlimited
+    HOST_RATE_BURST: int = 3
+    # Delay before re-trying a job whose host is at its concurrency cap (seconds)
+    SCHEDULER_RETRY_DELAY: float = 5.0
+    # A job may be deferred this many times before arq gives up on it
+    SCHEDULER_MAX_DEFERRALS: int = 500
 
     model_config = SettingsConfigDict(extra='ignore')
 
@@ -0,0 +1,41 @@
+import logging
+import shutil
+from pathlib import Path
+from typing import Optional
+
+from .config import settings
+from .urls import host_key
+
+logger = logging.getLogger(__name__)
+
+# Écrits par le backend (backend/app/cookies.py), de façon atomique
+JAR_NAME = "cookies.txt"
+SITES_DIRNAME = "sites"
+
+
+def cookie_slice(url: str) -> Optional[Path]:
+    """Cookie file for `url`: the slice of its site, else the whole jar (None if there is none)."""
+    cookie_dir = Path(settings.COOKIE_DIR)
+    site_file = cookie_dir / SITES_DIRNAME / f"{host_key(url)}.txt"
+    if site_file.exists():
+        return site_file
+    jar = cookie_dir / JAR_NAME
+    return jar if jar.exists() else None
+
+
+def job_cookie_file(url: str, workdir: Path) -> Optional[Path]:
+    """
+    Private copy of the cookies for `url` in `workdir`. yt-dlp and gallery-dl
+    write their cookie file back when they finish: they must never do it on
+    the shared files.
+    """
+    src = cookie_slice(url)
+    if src is None:
+        return None
+    dest = workdir / "cookies.txt"
+    try:
+        shutil.copyfile(src, dest)
+    except OSError as e:
+        logger.warning(f"Cookies indisponibles ({e}), téléchargement sans cookies.")
+        return None
+    return dest
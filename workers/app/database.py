@@ -6,6 +6,11 @@ from .config import settings
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=False,
+    # Pooled connections shared by the concurrent jobs of this process
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=settings.DB_POOL_RECYCLE,
 )
 
 # Create a configured "Session" class
@@ -0,0 +1,87 @@
+import logging
+from typing import Optional
+
+from sqlalchemy import select
+
+from .database import AsyncSessionLocal
+from .models import Media
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+URL_KEY_PREFIX = "dedup:url:"
+EXTRACTOR_KEY_PREFIX = "dedup:id:"
+
+
+class DedupIndex:
+    """
+    Pre-download lookup of already ingested media.
+
+    Keys on the normalized source URL and on the (extractor, video id) pair
+    returned by the yt-dlp probe. Redis acts as a read-through cache in front
+    of the indexed `media.source_url` / `media.extractor` columns.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    @staticmethod
+    def _extractor_key(extractor: str, extractor_id: str) -> str:
+        return f"{EXTRACTOR_KEY_PREFIX}{extractor.lower()}:{extractor_id}"
+
+    async def _cached(self, key: str) -> Optional[str]:
+        value = await self.redis.get(key)
+        if value is None:
+            return None
+        return value.decode() if isinstance(value, bytes) else value
+
+    async def _remember(self, key: str, file_hash: str) -> None:
+        await self.redis.set(key, file_hash, ex=settings.DEDUP_CACHE_TTL)
+
+    async def lookup_url(self, normalized_url: str) -> Optional[str]:
+        """Returns the file_hash already stored for this URL, if any."""
+        key = URL_KEY_PREFIX + normalized_url
+        file_hash = await self._cached(key)
+        if file_hash:
+            return file_hash
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Media.file_hash).where(Media.source_url == normalized_url).limit(1)
+            )
+            file_hash = result.scalar()
+
+        if file_hash:
+            await self._remember(key, file_hash)
+        return file_hash
+
+    async def lookup_extractor(self, extractor: str, extractor_id: str) -> Optional[str]:
+        """Returns the file_hash already stored for this (extractor, id) pair, if any."""
+        if not extractor or not extractor_id:
+            return None
+        key = self._extractor_key(extractor, extractor_id)
+        file_hash = await self._cached(key)
+        if file_hash:
+            return file_hash
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(Media.file_hash)
+                .where(Media.extractor == extractor, Media.extractor_id == extractor_id)
+                .limit(1)
+            )
+            file_hash = result.scalar()
+
+        if file_hash:
+            await self._remember(key, file_hash)
+        return file_hash
+
+    async def remember(self, file_hash: str, normalized_url: Optional[str] = None,
+                       extractor: Optional[str] = None, extractor_id: Optional[str] = None) -> None:
+        """Primes the cache once a media is known to exist in the DB."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if normalized_url:
+                pipe.set(URL_KEY_PREFIX + normalized_url, file_hash, ex=settings.DEDUP_CACHE_TTL)
+            if extractor and extractor_id:
+                pipe.set(self._extractor_key(extractor, extractor_id), file_hash, ex=settings.DEDUP_CACHE_TTL)
+            await pipe.execute()
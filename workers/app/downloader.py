@@ -1,32 +1,242 @@
 import asyncio
 import hashlib
-import shutil
+import json
+import time
+import uuid
+import errno
 import logging
+import mmap
 import os
-import subprocess
+import shutil
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import Dict, Any
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Tuple
 
 import yt_dlp
 
+from .config import settings
+from .cookies import job_cookie_file
+from .gallery_dl_helper import GalleryDlPool
+from .metadata import gallery_fields, ytdlp_fields
+from .metrics import BYTES, FAILURES, FALLBACKS, StageTimer
+from .paths import media_relpath
+from .routing import ExtractorRouter, GALLERY_DL, YTDLP
+from .urls import host_key, normalize_url
+from .ytdlp_pool import YoutubeDLPool
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-COOKIE_FILE = Path("/data/cookies.txt")
+INFO_CACHE_PREFIX = "ytdlp:info:"
+HASH_BUFFER_SIZE = 1024 * 1024  # 1 MiB : peu d'appels système, même sur le montage NAS
+COPY_CHUNK_SIZE = 8 * 1024 * 1024  # staging local -> NAS
+# copy_file_range / sendfile non supportés entre ces deux systèmes de fichiers
+KERNEL_COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+# Fichiers d'un post gallery-dl hashés/copiés en même temps
+STORE_CONCURRENCY = 4
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+VIDEO_SUFFIXES = {'.mp4', '.webm', '.mov', '.m4v', '.mkv'}
+GALLERY_SUFFIXES = IMAGE_SUFFIXES | VIDEO_SUFFIXES
+
+
+def media_type_for(path: Path, default: str) -> str:
+    """'video' / 'image' from the file extension (a carousel can mix both)."""
+    suffix = path.suffix.lower()
+    if suffix in VIDEO_SUFFIXES:
+        return "video"
+    if suffix in IMAGE_SUFFIXES:
+        return "image"
+    return default
+
 
 class MediaDownloader:
+    def __init__(self, redis=None, progress=None,
+                 ydl_pool: Optional[YoutubeDLPool] = None, gallery_dl: Optional[GalleryDlPool] = None):
+        # Redis optionnel : cache TTL des info dicts yt-dlp (retries, doublons)
+        self.redis = redis
+        # ProgressReporter optionnel : progression publiée en temps réel
+        self.progress = progress
+        # Routage appris yt-dlp / gallery-dl, partagé via Redis
+        self.router = ExtractorRouter(redis) if redis is not None else None
+        # Durées par étape (probe, téléchargement, hash...) : métriques + résultat du job
+        self.timer = StageTimer()
+        # Instances yt-dlp réutilisées entre jobs (sinon une par job) ; helpers
+        # gallery-dl persistants (sinon un processus CLI par job)
+        self.ydl_pool = ydl_pool or YoutubeDLPool(max_idle=0)
+        self.gallery_dl = gallery_dl
+
+    async def _record_route(self, url: str, backend: str, success: bool) -> None:
+        if self.router:
+            await self.router.record(url, backend, success)
+
+    @staticmethod
+    def staging_dir(dest_path: Path) -> Path:
+        """
+        Local scratch directory for fragments, merges and remuxes.
+
+        Falls back to staging on the destination itself when the local disk
+        does not have STAGING_MIN_FREE_BYTES available.
+        """
+        staging = Path(settings.STAGING_PATH)
+        try:
+            staging.mkdir(parents=True, exist_ok=True)
+            free = shutil.disk_usage(staging).free
+        except OSError as e:
+            logger.warning(f"⚠️ Staging local indisponible ({e}), staging sur le NAS.")
+            return dest_path
+        if free < settings.STAGING_MIN_FREE_BYTES:
+            logger.warning(f"⚠️ Staging local presque plein ({free // 2**20} Mo libres), staging sur le NAS.")
+            return dest_path
+        return staging
+
+    def _info_cache_key(self, url: str) -> str:
+        return INFO_CACHE_PREFIX + normalize_url(url)
+
+    async def _load_cached_info(self, url: str) -> Optional[Dict[str, Any]]:
+        if self.redis is None or settings.INFO_CACHE_TTL <= 0:
+            return None
+        try:
+            raw = await self.redis.get(self._info_cache_key(url))
+        except Exception as e:
+            logger.warning(f"Cache info yt-dlp indisponible : {e}")
+            return None
+        return json.loads(raw) if raw else None
+
+    async def _store_cached_info(self, url: str, ydl: yt_dlp.YoutubeDL, info: Dict[str, Any]) -> None:
+        # Seules les vidéos simples sont cachées : les playlists ont des entrées paresseuses
+        if self.redis is None or settings.INFO_CACHE_TTL <= 0 or info.get('_type', 'video') != 'video':
+            return
+        try:
+            payload = json.dumps(ydl.sanitize_info(info))
+            await self.redis.set(self._info_cache_key(url), payload, ex=settings.INFO_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Impossible de mettre en cache l'info yt-dlp : {e}")
+
+    async def _drop_cached_info(self, url: str) -> None:
+        if self.redis is not None:
+            await self.redis.delete(self._info_cache_key(url))
+
     @staticmethod
-    async def _calculate_sha256(file_path: Path) -> str:
+    def _sha256_file(file_path: Path) -> str:
+        """Hashes a file with one reusable large buffer (runs in a thread, never on the loop)."""
         sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
+        buffer = bytearray(HASH_BUFFER_SIZE)
+        view = memoryview(buffer)
+        with open(file_path, "rb", buffering=0) as f:
+            while True:
+                n = f.readinto(buffer)
+                if not n:
+                    break
+                sha256_hash.update(view[:n])
         return sha256_hash.hexdigest()
 
-    async def _try_gallery_dl(self, url: str, tmp_path: Path) -> Path:
-        logger.info(f"🖼️ Tentative avec gallery-dl pour : {url}")
-        
+    @staticmethod
+    def _copy_chunk(src_fd: int, dst_fd: int, offset: int, count: int, chunk: memoryview) -> None:
+        """Writes `count` bytes of `src_fd` at `offset` into `dst_fd`, preferring in-kernel copies."""
+        copied = 0
+        if hasattr(os, "copy_file_range"):
+            try:
+                while copied < count:
+                    n = os.copy_file_range(src_fd, dst_fd, count - copied, offset + copied, offset + copied)
+                    if n == 0:
+                        break
+                    copied += n
+                if copied == count:
+                    return
+            except OSError as e:
+                if e.errno not in KERNEL_COPY_FALLBACK_ERRNOS:
+                    raise
+        os.lseek(dst_fd, offset + copied, os.SEEK_SET)
+        try:
+            while copied < count:
+                n = os.sendfile(dst_fd, src_fd, offset + copied, count - copied)
+                if n == 0:
+                    break
+                copied += n
+            if copied == count:
+                return
+        except OSError as e:
+            if e.errno not in KERNEL_COPY_FALLBACK_ERRNOS:
+                raise
+        # Dernier recours : écriture userspace depuis le mmap déjà en cache
+        os.lseek(dst_fd, offset + copied, os.SEEK_SET)
+        while copied < count:
+            copied += os.write(dst_fd, chunk[copied:count])
+
+    @classmethod
+    def _copy_with_sha256(cls, src: Path, dst: Path) -> str:
+        """
+        Copies `src` to `dst` and hashes it in the same pass.
+
+        Each chunk is hashed from a read-only mmap of the (local) source, then
+        copied by the kernel (copy_file_range, else sendfile) from the page
+        cache it was just loaded into: one local read, one sequential write.
+        """
+        sha256_hash = hashlib.sha256()
+        with open(src, "rb") as fin, open(dst, "wb") as fout:
+            src_fd, dst_fd = fin.fileno(), fout.fileno()
+            size = os.fstat(src_fd).st_size
+            if size:
+                with mmap.mmap(src_fd, 0, access=mmap.ACCESS_READ) as mm:
+                    view = memoryview(mm)
+                    try:
+                        offset = 0
+                        while offset < size:
+                            count = min(COPY_CHUNK_SIZE, size - offset)
+                            chunk = view[offset:offset + count]
+                            sha256_hash.update(chunk)
+                            cls._copy_chunk(src_fd, dst_fd, offset, count, chunk)
+                            chunk.release()
+                            offset += count
+                    finally:
+                        view.release()
+            os.fsync(dst_fd)
+        return sha256_hash.hexdigest()
+
+    @classmethod
+    async def _calculate_sha256(cls, file_path: Path) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, cls._sha256_file, file_path)
+
+    @classmethod
+    async def store_by_hash(cls, src: Path, dest_path: Path) -> Tuple[str, Path, float]:
+        """
+        Moves `src` into `dest_path` under its content-addressed path (see paths.py).
+
+        Same filesystem (NAS staging fallback): hash in a thread then rename.
+        Otherwise (local staging) the file is hashed while it is copied, so the
+        NAS only sees one sequential write.
+        Returns (file_hash, final_path, hash_seconds).
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+
+        if src.stat().st_dev == dest_path.stat().st_dev:
+            file_hash = await cls._calculate_sha256(src)
+            hash_seconds = time.perf_counter() - start
+            final_destination = dest_path / media_relpath(file_hash, src.suffix)
+            final_destination.parent.mkdir(parents=True, exist_ok=True)
+            await loop.run_in_executor(None, os.replace, src, final_destination)
+            return file_hash, final_destination, hash_seconds
+
+        # Nom unique : deux jobs peuvent stocker en même temps un fichier du même nom
+        partial = dest_path / f".{src.name}.{uuid.uuid4().hex}.part"
+        try:
+            file_hash = await loop.run_in_executor(None, cls._copy_with_sha256, src, partial)
+            hash_seconds = time.perf_counter() - start
+            final_destination = dest_path / media_relpath(file_hash, src.suffix)
+            final_destination.parent.mkdir(parents=True, exist_ok=True)
+            await loop.run_in_executor(None, os.replace, partial, final_destination)
+        finally:
+            partial.unlink(missing_ok=True)
+        src.unlink(missing_ok=True)
+        return file_hash, final_destination, hash_seconds
+
+    @staticmethod
+    async def _run_gallery_dl_cli(url: str, tmp_path: Path, cookie_file: Optional[Path],
+                                  on_file: Callable[[str], None]) -> Tuple[int, str]:
+        """One gallery-dl CLI process for `url`; returns its exit status and stderr."""
         cmd = [
             "gallery-dl",
             "--directory", str(tmp_path),
@@ -36,97 +246,242 @@ class MediaDownloader:
         ]
         
         # Ajout des cookies si présents
-        if COOKIE_FILE.exists():
-            cmd.extend(["--cookies", str(COOKIE_FILE)])
+        if cookie_file:
+            cmd.extend(["--cookies", str(cookie_file)])
 
         process = await asyncio.create_subprocess_exec(
             *cmd,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE
         )
-        stdout, stderr = await process.communicate()
+        # gallery-dl écrit le chemin de chaque fichier terminé sur stdout :
+        # lecture ligne à ligne pour publier la progression au fil de l'eau.
+        stderr_task = asyncio.create_task(process.stderr.read())
+        async for line in process.stdout:
+            if line.strip() and not line.startswith(b"#"):
+                on_file(line.decode().strip())
+        stderr = await stderr_task
+        await process.wait()
+        return process.returncode, stderr.decode()
 
-        if process.returncode != 0:
-            error_msg = stderr.decode()
-            logger.error(f"gallery-dl a échoué : {error_msg}")
-            raise RuntimeError(f"gallery-dl failed. Logs: {error_msg[:200]}...")
+    async def _try_gallery_dl(self, url: str, tmp_path: Path,
+                              cookie_file: Optional[Path] = None) -> List[Tuple[Path, Optional[Dict[str, Any]]]]:
+        """Runs gallery-dl and returns every downloaded file of the post with its metadata."""
+        logger.info(f"🖼️ Tentative avec gallery-dl pour : {url}")
+        
+        downloaded = 0
+
+        def on_file(path: str) -> None:
+            nonlocal downloaded
+            downloaded += 1
+            if self.progress:
+                self.progress.update(stage="downloading", files=downloaded)
+
+        with self.timer.stage("gallery_dl"):
+            if self.gallery_dl is not None:
+                returncode, error_msg = await self.gallery_dl.run(url, tmp_path, cookie_file, on_file)
+            else:
+                returncode, error_msg = await self._run_gallery_dl_cli(url, tmp_path, cookie_file, on_file)
+
+            if returncode != 0:
+                logger.error(f"gallery-dl a échoué : {error_msg}")
+                raise RuntimeError(f"gallery-dl failed. Logs: {error_msg[:200]}...")
 
-        files = [f for f in tmp_path.rglob("*") if f.is_file() and f.suffix.lower() in ['.jpg', '.jpeg', '.png', '.gif', '.webp']]
+        files = [f for f in tmp_path.rglob("*") if f.is_file() and f.suffix.lower() in GALLERY_SUFFIXES]
         if not files:
             raise FileNotFoundError("gallery-dl a fini mais aucune image trouvée.")
 
-        return files[0]
+        # --write-metadata : un <fichier>.json à côté de chaque média
+        entries = []
+        for f in files:
+            metadata = None
+            meta_file = f.with_name(f.name + ".json")
+            if meta_file.exists():
+                try:
+                    metadata = json.loads(meta_file.read_text(encoding="utf-8"))
+                except ValueError as e:
+                    logger.warning(f"Métadonnées gallery-dl illisibles ({meta_file.name}): {e}")
+            entries.append((f, metadata))
+
+        # Ordre du post (carrousel, thread) : numéro gallery-dl, sinon nom de fichier
+        entries.sort(key=lambda e: ((e[1] or {}).get("num") or 0, e[0].name))
+        return entries
+
+    async def _try_ytdlp(
+        self,
+        url: str,
+        tmp_path: Path,
+        known_media: Optional[Callable[[str, str], Awaitable[Optional[str]]]] = None,
+    ) -> Dict[str, Any]:
+        """Probes and downloads `url` with yt-dlp; returns a `duplicate` result if `known_media` knows it."""
+        loop = asyncio.get_running_loop()
+
+        # Une instance du pool, aux cookies du site : l'info extraite au probe
+        # est réutilisée telle quelle pour le téléchargement (pas de 2e extraction).
+        progress_hook = self.progress.ytdlp_hook if self.progress else None
+        init_start = time.perf_counter()
+        async with self.ydl_pool.lease(url, tmp_path, progress_hook) as ydl:
+            self.timer.record("ytdlp_init", time.perf_counter() - init_start)
+            # 1. Analyse (Probe) : cache Redis d'abord, sinon extraction sans traitement
+            with self.timer.stage("probe"):
+                info = await self._load_cached_info(url)
+                from_cache = info is not None
+                if info is None:
+                    info = await loop.run_in_executor(None, lambda: ydl.extract_info(url, download=False, process=False))
+            if 'twitter' in url and not info.get('formats'):
+                 raise ValueError("Twitter sans vidéo détectée -> switch gallery-dl")
+            if not from_cache:
+                await self._store_cached_info(url, ydl, info)
+
+            extractor = info.get('extractor_key') or info.get('ie_key')
+            extractor_id = info.get('id')
+            if known_media and extractor and extractor_id:
+                existing_hash = await known_media(extractor, str(extractor_id))
+                if existing_hash:
+                    logger.info(f"⏭️ Déjà en bibliothèque ({extractor}:{extractor_id}), pas de téléchargement.")
+                    return {
+                        "duplicate": True,
+                        "file_hash": existing_hash,
+                        "extractor": extractor,
+                        "extractor_id": str(extractor_id),
+                    }
+
+            # 2. Téléchargement YT-DLP à partir de l'info déjà extraite
+            with self.timer.stage("ytdlp_download"):
+                try:
+                    info_dict = await loop.run_in_executor(None, lambda: ydl.process_ie_result(info, download=True))
+                except Exception as e:
+                    if not from_cache:
+                        raise
+                    # Les URLs de formats en cache ont pu expirer : on ré-extrait une fois
+                    logger.info(f"♻️ Info en cache périmée ({e}), nouvelle extraction.")
+                    await self._drop_cached_info(url)
+                    info_dict = await loop.run_in_executor(None, lambda: ydl.extract_info(url, download=True))
+
+            if 'requested_downloads' in info_dict:
+                final_file_path = Path(info_dict['requested_downloads'][0]['filepath'])
+            else:
+                final_file_path = Path(ydl.prepare_filename(info_dict))
+
+        return {
+            "downloaded": [(final_file_path, None)],
+            "title": info_dict.get('title', 'Video'),
+            "fields": ytdlp_fields(info_dict),
+            "extractor": extractor,
+            "extractor_id": extractor_id,
+            "codecs": {
+                "ext": info_dict.get('ext'),
+                "vcodec": info_dict.get('vcodec'),
+                "acodec": info_dict.get('acodec'),
+            },
+        }
+
+    async def download_and_process(
+        self,
+        url: str,
+        destination_folder: str,
+        known_media: Optional[Callable[[str, str], Awaitable[Optional[str]]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Downloads `url` and moves it into `destination_folder` under its content hash.
+
+        yt-dlp and gallery-dl are tried in the order the routing table expects
+        to succeed for this kind of URL; the other one is the fallback.
 
-    async def download_and_process(self, url: str, destination_folder: str) -> Dict[str, Any]:
+        `known_media(extractor, video_id)` is awaited right after the yt-dlp
+        probe: if it returns a file hash, the download is skipped and a
+        `duplicate` result is returned instead.
+        """
         dest_path = Path(destination_folder)
         dest_path.mkdir(parents=True, exist_ok=True)
 
-        with TemporaryDirectory(dir=destination_folder) as tmpdir:
+        with TemporaryDirectory(dir=self.staging_dir(dest_path)) as tmpdir:
             tmp_path = Path(tmpdir)
-            loop = asyncio.get_running_loop()
-            
-            final_file_path = None
+
+            downloaded: List[Tuple[Path, Optional[Dict[str, Any]]]] = []
             detected_type = "video"
             info_title = "Unknown"
+            extractor = None
+            extractor_id = None
+            codecs = None
+            fields = None  # yt-dlp : mêmes champs de recherche pour l'unique fichier
 
-            # Options de base (communes)
-            base_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                # LA CLE MAGIQUE : On utilise le fichier de cookies s'il existe
-                'cookiefile': str(COOKIE_FILE) if COOKIE_FILE.exists() else None,
-            }
-
-            try:
-                # 1. Analyse (Probe)
-                probe_opts = base_opts.copy()
-                probe_opts.update({'extract_flat': True, 'ignore_no_formats_error': True})
-                
-                with yt_dlp.YoutubeDL(probe_opts) as ydl_probe:
-                    info = await loop.run_in_executor(None, lambda: ydl_probe.extract_info(url, download=False))
-                    if 'twitter' in url and not info.get('formats'):
-                         raise ValueError("Twitter sans vidéo détectée -> switch gallery-dl")
-
-                # 2. Téléchargement YT-DLP
-                dl_opts = base_opts.copy()
-                dl_opts.update({
-                    'outtmpl': str(tmp_path / '%(id)s.%(ext)s'),
-                    'noplaylist': True,
-                    'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
-                })
-
-                with yt_dlp.YoutubeDL(dl_opts) as ydl:
-                    info_dict = await loop.run_in_executor(None, lambda: ydl.extract_info(url, download=True))
-                    if 'requested_downloads' in info_dict:
-                        final_file_path = Path(info_dict['requested_downloads'][0]['filepath'])
+            domain = host_key(url)
+            order = await self.router.order(url) if self.router else [YTDLP, GALLERY_DL]
+            last_error: Optional[Exception] = None
+            for attempt, backend in enumerate(order):
+                # Un dossier par outil : les restes d'un échec ne sont pas pris pour le résultat de l'autre
+                backend_path = tmp_path / backend
+                backend_path.mkdir()
+                try:
+                    if backend == YTDLP:
+                        outcome = await self._try_ytdlp(url, backend_path, known_media)
+                        if outcome.get("duplicate"):
+                            await self._record_route(url, backend, True)
+                            return outcome
+                        downloaded = outcome["downloaded"]
+                        detected_type = "video"
+                        info_title = outcome["title"]
+                        extractor = outcome["extractor"]
+                        extractor_id = outcome["extractor_id"]
+                        codecs = outcome["codecs"]
+                        fields = outcome["fields"]
                     else:
-                        final_file_path = Path(ydl.prepare_filename(info_dict))
-                    info_title = info_dict.get('title', 'Video')
+                        # yt-dlp a sa copie des cookies dans le pool ; gallery-dl en reçoit une par job
+                        downloaded = await self._try_gallery_dl(url, backend_path, job_cookie_file(url, tmp_path))
+                        detected_type = "image"
+                        info_title = downloaded[0][0].stem
+                except Exception as e:
+                    await self._record_route(url, backend, False)
+                    FAILURES.labels(backend, domain).inc()
+                    last_error = e
+                    if attempt + 1 < len(order):
+                        FALLBACKS.labels(backend, domain).inc()
+                        logger.warning(f"⚠️ {backend} a échoué ({str(e)}), passage à {order[attempt + 1]}...")
+                    continue
+                await self._record_route(url, backend, True)
+                break
+            else:
+                logger.error(f"❌ Tout a échoué.")
+                raise last_error
 
-            except Exception as e:
-                logger.warning(f"⚠️ Passage à gallery-dl ({str(e)})...")
-                try:
-                    final_file_path = await self._try_gallery_dl(url, tmp_path)
-                    detected_type = "image"
-                    info_title = final_file_path.stem
-                except Exception as g_e:
-                    logger.error(f"❌ Tout a échoué.")
-                    raise g_e
-
-            if not final_file_path or not final_file_path.exists():
+            downloaded = [(f, meta) for f, meta in downloaded if f.exists()]
+            if not downloaded:
                 raise FileNotFoundError("Aucun fichier final récupéré.")
 
-            file_hash = await self._calculate_sha256(final_file_path)
-            original_ext = final_file_path.suffix
-            final_filename = f"{file_hash}{original_ext}"
-            final_destination = dest_path / final_filename
+            if self.progress:
+                self.progress.update(stage="processing", files=len(downloaded))
+
+            # Hash + copie vers le NAS de tous les fichiers du post en parallèle
+            semaphore = asyncio.Semaphore(STORE_CONCURRENCY)
+
+            async def store(src: Path):
+                async with semaphore:
+                    return await self.store_by_hash(src, dest_path)
+
+            with self.timer.stage("hash"):
+                stored = await asyncio.gather(*(store(f) for f, _ in downloaded))
+            logger.info(f"#️⃣ {len(stored)} fichier(s) hashé(s) et stocké(s) en {self.timer.seconds['hash']:.2f}s")
+
+            files = []
+            for index, ((src, metadata), (file_hash, final_destination, _)) in enumerate(zip(downloaded, stored)):
+                files.append({
+                    "file_hash": file_hash,
+                    "filename": final_destination.relative_to(dest_path).as_posix(),
+                    "file_size": final_destination.stat().st_size,
+                    "type": media_type_for(final_destination, detected_type),
+                    "metadata": metadata,
+                    "post_index": index if len(downloaded) > 1 else None,
+                    "fields": fields or gallery_fields(metadata, info_title),
+                })
+            BYTES.labels(backend, domain).inc(sum(f["file_size"] for f in files))
 
-            await loop.run_in_executor(None, shutil.move, str(final_file_path), str(final_destination))
-            
             return {
                 "title": info_title,
-                "file_size": final_destination.stat().st_size,
-                "file_hash": file_hash,
-                "filename": final_filename,
-                "type": detected_type
-            }
\ No newline at end of file
+                "type": detected_type,
+                "files": files,
+                "extractor": extractor,
+                "extractor_id": str(extractor_id) if extractor_id is not None else None,
+                "codecs": codecs,
+                "timings": self.timer.as_dict(),
+            }
@@ -0,0 +1,183 @@
+"""
+Long-lived gallery-dl process, driven by GalleryDlPool.
+
+gallery-dl is imported (and its extractors loaded) once when the helper
+starts, then each request is run in-process with the same options as the
+CLI call it replaces (`gallery-dl --directory D --no-mtime
+--write-metadata [--cookies F] URL`). One JSON object per line each way:
+
+    stdin   {"url": ..., "directory": ..., "cookies": ... or null}
+    stdout  {"ready": true}                   once, after startup
+            {"file": path}                    each file downloaded
+            {"done": status, "error": text}   end of the request (status 0 = success)
+
+Anything else gallery-dl prints goes to stderr. This module is run as a
+script and must not import the worker's settings.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Démarrage d'un helper : import de gallery-dl et de tous ses extracteurs
+STARTUP_TIMEOUT = 60
+
+
+class _ErrorCapture(logging.Handler):
+    """Keeps the ERROR records of the current request: the failure message sent back."""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.messages: List[str] = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+def _serve() -> None:
+    # Le protocole garde le vrai stdout ; tout le reste (print, sorties gallery-dl) part sur stderr
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1, encoding="utf-8")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    def send(**message) -> None:
+        protocol.write(json.dumps(message) + "\n")
+
+    from gallery_dl import config, exception, extractor, job, output
+
+    errors = _ErrorCapture()
+    logging.basicConfig(level=logging.WARNING, format="[gallery-dl][%(name)s][%(levelname)s] %(message)s")
+    logging.getLogger().addHandler(errors)
+
+    class ProtocolOutput(output.NullOutput):
+        def success(self, path):
+            send(file=path)
+
+    output.select = ProtocolOutput
+
+    # Charge et compile tous les extracteurs maintenant plutôt qu'au premier job
+    extractor.find("https://example.invalid/")
+    send(ready=True)
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        errors.messages.clear()
+
+        config.clear()
+        config.load()
+        config.remap_categories()
+        config.set((), "base-directory", request["directory"])
+        config.set((), "directory", ())
+        config.set((), "mtime", False)
+        config.set((), "postprocessors", ["metadata"])
+        if request.get("cookies"):
+            config.set((), "cookies", request["cookies"])
+
+        try:
+            status = job.DownloadJob(request["url"]).run()
+        except exception.NoExtractorError:
+            logging.getLogger("gallery-dl").error("Unsupported URL '%s'", request["url"])
+            status = 64
+        except Exception as e:
+            logging.getLogger("gallery-dl").error(f"{e.__class__.__name__}: {e}")
+            status = 1
+        send(done=status, error="\n".join(errors.messages))
+
+
+class _Helper:
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+
+    @classmethod
+    async def spawn(cls) -> "_Helper":
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, str(Path(__file__).resolve()),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        helper = cls(process)
+        try:
+            line = await asyncio.wait_for(process.stdout.readline(), STARTUP_TIMEOUT)
+            if not json.loads(line or b"{}").get("ready"):
+                raise RuntimeError("le helper gallery-dl n'a pas démarré")
+        except BaseException:
+            helper.kill()
+            raise
+        return helper
+
+    async def run(self, url: str, directory: Path, cookie_file: Optional[Path],
+                  on_file: Optional[Callable[[str], None]]) -> Tuple[int, str]:
+        request = {"url": url, "directory": str(directory), "cookies": str(cookie_file) if cookie_file else None}
+        self.process.stdin.write((json.dumps(request) + "\n").encode())
+        await self.process.stdin.drain()
+        async for line in self.process.stdout:
+            message = json.loads(line)
+            if "file" in message:
+                if on_file:
+                    on_file(message["file"])
+            elif "done" in message:
+                return message["done"], message.get("error") or ""
+        raise RuntimeError(f"le helper gallery-dl s'est arrêté (code {await self.process.wait()})")
+
+    def kill(self) -> None:
+        if self.process.returncode is None:
+            self.process.kill()
+
+
+class GalleryDlPool:
+    """
+    gallery-dl helpers kept alive between jobs, so a job no longer pays for
+    starting an interpreter and importing gallery-dl. A job takes an idle
+    helper (or starts one), at most `max_idle` are kept; a helper whose job
+    fails or is cancelled mid-request is killed, never reused.
+    """
+
+    def __init__(self, max_idle: int):
+        self.max_idle = max_idle
+        self._idle: List[_Helper] = []
+
+    async def start(self, count: int) -> None:
+        """Starts `count` helpers ahead of the first jobs."""
+        for _ in range(min(count, self.max_idle) - len(self._idle)):
+            self._idle.append(await _Helper.spawn())
+
+    async def run(self, url: str, directory: Path, cookie_file: Optional[Path] = None,
+                  on_file: Optional[Callable[[str], None]] = None) -> Tuple[int, str]:
+        """Downloads `url` into `directory`; returns gallery-dl's exit status and error messages."""
+        helper = None
+        while self._idle and helper is None:
+            helper = self._idle.pop()
+            if helper.process.returncode is not None:
+                helper = None
+        if helper is None:
+            helper = await _Helper.spawn()
+
+        try:
+            result = await helper.run(url, directory, cookie_file, on_file)
+        except BaseException:
+            helper.kill()
+            raise
+        if len(self._idle) < self.max_idle:
+            self._idle.append(helper)
+        else:
+            helper.kill()
+        return result
+
+    async def close(self) -> None:
+        while self._idle:
+            helper = self._idle.pop()
+            helper.process.stdin.close()
+            try:
+                await asyncio.wait_for(helper.process.wait(), 5)
+            except asyncio.TimeoutError:
+                helper.kill()
+
+
+if __name__ == "__main__":
+    _serve()
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from .database import engine
+from .models import Media
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MediaWriter:
+    """
+    Inserts `media` rows with a single `INSERT ... ON CONFLICT (file_hash)
+    DO NOTHING RETURNING file_hash` round trip.
+
+    The unique constraint decides which job owns a file, so two workers
+    ingesting the same content never race between a SELECT and an INSERT.
+    """
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> Set[str]:
+        stmt = (
+            pg_insert(Media)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[Media.file_hash])
+            .returning(Media.file_hash)
+        )
+        async with engine.begin() as conn:
+            result = await conn.execute(stmt)
+            return set(result.scalars().all())
+
+    async def write(self, rows: List[Dict[str, Any]]) -> Set[str]:
+        """Inserts `rows`; returns the file hashes that were new."""
+        if not rows:
+            return set()
+        return await self._insert(rows)
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class BufferedMediaWriter(MediaWriter):
+    """
+    Write-behind variant of `MediaWriter`: rows submitted by concurrent jobs
+    are flushed together, every MEDIA_WRITE_FLUSH_INTERVAL seconds or as soon
+    as MEDIA_WRITE_BATCH_SIZE rows are waiting, as one multi-row INSERT.
+
+    `write` still waits for its batch to be committed, so a job only reports
+    success (and schedules previews) for rows that are in the database.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: List[Tuple[List[Dict[str, Any]], asyncio.Future]] = []
+        self._pending_rows = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def write(self, rows: List[Dict[str, Any]]) -> Set[str]:
+        if not rows:
+            return set()
+        if self._task is None:
+            # Not started (or already closed): write through
+            return await self._insert(rows)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((rows, future))
+        self._pending_rows += len(rows)
+        if self._pending_rows >= self.batch_size:
+            self._wakeup.set()
+        return await future
+
+    async def _flush(self) -> None:
+        batch, self._pending, self._pending_rows = self._pending, [], 0
+        if not batch:
+            return
+
+        # Same file submitted twice in one batch: the first submitter owns it
+        owner: Dict[str, asyncio.Future] = {}
+        rows = []
+        for job_rows, future in batch:
+            for row in job_rows:
+                if row["file_hash"] not in owner:
+                    owner[row["file_hash"]] = future
+                    rows.append(row)
+
+        try:
+            inserted = await self._insert(rows)
+        except Exception as e:
+            logger.error(f"❌ Écriture groupée de {len(rows)} média(s) échouée: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for _, future in batch:
+            if not future.done():
+                future.set_result({h for h in inserted if owner[h] is future})
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._flush()
+        await self._flush()
+
+    async def start(self) -> None:
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        # Last flush happens in the loop itself, never in the middle of a batch
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+
+def create_media_writer() -> MediaWriter:
+    if settings.MEDIA_WRITE_BUFFER:
+        return BufferedMediaWriter(settings.MEDIA_WRITE_BATCH_SIZE, settings.MEDIA_WRITE_FLUSH_INTERVAL)
+    return MediaWriter()
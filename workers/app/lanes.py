@@ -0,0 +1,136 @@
+import asyncio
+import logging
+
+from arq.constants import in_progress_key_prefix
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_QUEUE = "arq:queue"
+# Doit correspondre à backend/app/jobs.py
+LANE_KEY_PREFIX = "arq:lane:"
+LANES = ("interactive", "normal", "bulk")
+CREDITS_KEY = "arq:lane-credits"
+# Download jobs finished (complete / failed), read by the API's job counters
+JOB_COUNTS_KEY = "arq:job-counts"
+# Recently finished download jobs by outcome (zset job id -> finish time, ms),
+# paged by the API's job listing; trimmed as arq expires their results.
+FINISHED_KEY_PREFIX = "arq:finished:"
+FINISHED_RETENTION_MS = 3600 * 1000  # arq's default keep_result
+
+# Lanes ahead of bulk get queue scores this much earlier per rank: arq takes
+# ready jobs by score, so a click dispatched behind a full buffer of bulk jobs
+# still runs next.
+LANE_PRIORITY_MS = 24 * 3600 * 1000
+
+# Atomically top up the ready part of the arq queue to `depth` jobs, taking
+# the oldest job of a lane chosen by smooth weighted round-robin (credits
+# persist across calls so the weights hold over time, not per call).
+# Running jobs stay in the queue until arq finishes them: jobs with an
+# in-progress key are not counted as ready. A lane only fills the buffer while
+# more than its `reserve` slots are free, and its jobs are scored `now - offset`.
+# KEYS: queue, credits hash, lane zsets...
+# ARGV: depth, in-progress key prefix, then weight, reserve, offset per lane
+# Returns the number of jobs moved.
+DISPATCH_SCRIPT = """
+local queue = KEYS[1]
+local credits = KEYS[2]
+local depth = tonumber(ARGV[1])
+local in_progress = ARGV[2]
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local room = depth
+for _, job in ipairs(redis.call('ZRANGEBYSCORE', queue, '-inf', now)) do
+    if redis.call('EXISTS', in_progress .. job) == 0 then
+        room = room - 1
+    end
+end
+local moved = 0
+while room > 0 do
+    local best, best_credit, best_job, best_offset = nil, nil, nil, nil
+    local total = 0
+    for j = 1, #KEYS - 2 do
+        local lane = KEYS[j + 2]
+        local reserve = tonumber(ARGV[3 * j + 1])
+        local head = room > reserve and redis.call('ZRANGEBYSCORE', lane, '-inf', now, 'LIMIT', 0, 1) or {}
+        if head[1] then
+            local weight = tonumber(ARGV[3 * j])
+            total = total + weight
+            local credit = tonumber(redis.call('HINCRBYFLOAT', credits, lane, weight))
+            if best == nil or credit > best_credit then
+                best, best_credit, best_job, best_offset = lane, credit, head[1], tonumber(ARGV[3 * j + 2])
+            end
+        end
+    end
+    if best == nil then
+        break
+    end
+    redis.call('HINCRBYFLOAT', credits, best, -total)
+    redis.call('ZREM', best, best_job)
+    redis.call('ZADD', queue, now - best_offset, best_job)
+    moved = moved + 1
+    room = room - 1
+end
+return moved
+"""
+
+
+def lane_key(lane: str) -> str:
+    return LANE_KEY_PREFIX + lane
+
+
+class LaneDispatcher:
+    """
+    Feeds the arq queue from the priority lanes (interactive, normal, bulk).
+
+    The API enqueues into one sorted set per lane; the arq queue itself is
+    only kept LANE_QUEUE_DEPTH ready jobs deep (running jobs aside), so a
+    click from the extension never waits behind a whole channel archive.
+    LANE_INTERACTIVE_RESERVE of those slots are left to the interactive lane,
+    whose jobs also sort first in the queue: a click runs on the next free
+    worker slot. Lanes share the slots by LANE_WEIGHTS, so bulk still
+    progresses while interactive work is waiting. Every worker runs a
+    dispatcher; the Lua script keeps them consistent.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self._dispatch = redis.register_script(DISPATCH_SCRIPT)
+        self._task = None
+
+    async def dispatch(self) -> int:
+        args = [settings.LANE_QUEUE_DEPTH, in_progress_key_prefix]
+        for rank, lane in enumerate(LANES):
+            reserve = 0 if lane == "interactive" else settings.LANE_INTERACTIVE_RESERVE
+            offset = (len(LANES) - 1 - rank) * LANE_PRIORITY_MS
+            args += [settings.LANE_WEIGHTS.get(lane, 1), reserve, offset]
+        return await self._dispatch(
+            keys=[DOWNLOAD_QUEUE, CREDITS_KEY, *(lane_key(lane) for lane in LANES)],
+            args=args,
+        )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                moved = await self.dispatch()
+                if moved:
+                    logger.debug(f"{moved} job(s) passés des files prioritaires à {DOWNLOAD_QUEUE}")
+            except Exception as e:
+                logger.warning(f"Dispatch des files prioritaires impossible: {e}")
+            await asyncio.sleep(settings.LANE_DISPATCH_INTERVAL)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -1,13 +1,36 @@
+import asyncio
 import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urlparse
+
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
 
+from .cache import bump_library_version
 from .downloader import MediaDownloader
+from .gallery_dl_helper import GalleryDlPool
+from .dedup import DedupIndex
+from .ingest import create_media_writer
+from .lanes import DOWNLOAD_QUEUE, FINISHED_KEY_PREFIX, FINISHED_RETENTION_MS, JOB_COUNTS_KEY, LaneDispatcher
+from .metrics import JOBS, RUNNING, start_metrics_server
 from .database import AsyncSessionLocal
 from .models import Media
+from .paths import media_abspath
+from .phash import FrameHash
+from .preview_pool import build_phashes, build_previews, create_preview_pool
+from .progress import ProgressReporter
+from .scheduler import HostScheduler
+from .similarity import find_similar, store_phashes
+from .transcode import enqueue_transcode, is_web_compatible
+from .urls import normalize_url, host_key, platform_for
+from .ytdlp_pool import YoutubeDLPool
 from .config import settings, Settings
 from arq.connections import RedisSettings
+from arq.constants import result_key_prefix
+from arq.jobs import deserialize_result
+from arq.utils import timestamp_ms
+from arq.worker import Retry
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -16,50 +39,272 @@ async def download_media_task(ctx, url: str):
     """
     Arq task to download media from a URL and save metadata to the database.
     """
-    downloader = MediaDownloader()
-    db_session: AsyncSession = AsyncSessionLocal()
+    progress = ProgressReporter(ctx['redis'], ctx['job_id'], url)
+    downloader = MediaDownloader(
+        redis=ctx['redis'], progress=progress, ydl_pool=ctx['ydl_pool'], gallery_dl=ctx['gallery_dl_pool'],
+    )
+    dedup = DedupIndex(ctx['redis'])
+    source_url = normalize_url(url)
+    host = host_key(url)
+    scheduler: HostScheduler = ctx['scheduler']
+    timer = downloader.timer
+    slot_acquired = False
+
+    async def finish(result):
+        # Dernier état publié au dashboard, puis résultat du job arq
+        JOBS.labels(result["status"], host).inc()
+        stage = "complete" if result["status"] == "success" else result["status"]
+        await progress.close(stage, file_hash=result.get("file_hash"))
+        return result
     
     try:
+        # 0. Dedup avant tout accès réseau : URL normalisée déjà connue ?
+        try:
+            existing_hash = await dedup.lookup_url(source_url)
+        except Exception as e:
+            logger.warning(f"Dedup lookup indisponible ({e}), on télécharge.")
+            existing_hash = None
+        if existing_hash:
+            logger.info(f"⏭️ URL déjà téléchargée (hash: {existing_hash}): {url}")
+            return await finish({"status": "skipped", "reason": "duplicate", "file_hash": existing_hash})
+
+        # 1. Limites par hôte : si le site est saturé, on rend le slot et on diffère le job
+        delay = await scheduler.acquire(host, ctx['job_id'])
+        if delay:
+            logger.info(f"⏳ {host} saturé, job différé de {delay:.1f}s: {url}")
+            JOBS.labels("deferred", host).inc()
+            await progress.close("deferred", retry_in=round(delay, 1))
+            raise Retry(defer=delay)
+        slot_acquired = True
+        RUNNING.inc()
+        # Attente totale depuis l'API (file prioritaire, arq:queue, reports pour hôte saturé)
+        timer.record("queue_wait", (datetime.now(timezone.utc) - ctx['enqueue_time']).total_seconds())
+        await progress.start()
+
+        async def known_media(extractor: str, extractor_id: str):
+            try:
+                return await dedup.lookup_extractor(extractor, extractor_id)
+            except Exception as e:
+                logger.warning(f"Dedup lookup indisponible ({e}), on télécharge.")
+                return None
+
         logger.info(f"🚀 Démarrage du téléchargement pour: {url}")
         
         # Use the downloader to get the media
         media_data = await downloader.download_and_process(
             url,
-            destination_folder=settings.NAS_MEDIA_PATH
+            destination_folder=settings.NAS_MEDIA_PATH,
+            known_media=known_media,
         )
+
+        if media_data.get("duplicate"):
+            await dedup.remember(media_data["file_hash"], normalized_url=source_url)
+            return await finish({"status": "skipped", "reason": "duplicate", "file_hash": media_data["file_hash"]})
         
-        # Check if a file with the same hash already exists
-        stmt = select(Media).where(Media.file_hash == media_data["file_hash"])
-        result = await db_session.execute(stmt)
-        existing_media = result.scalars().first()
-        
-        if existing_media:
-            logger.warning(f"👍 Fichier déjà existant (hash: {media_data['file_hash']}). Pas d'ajout en BDD.")
-            # Optionally, we could still link this URL to the existing media
-            return {"status": "skipped", "reason": "duplicate", "hash": media_data["file_hash"]}
-
-        # Create a new Media object
-        new_media = Media(
-            file_hash=media_data["file_hash"],
-            file_path=media_data["filename"], # path is relative to NAS_MEDIA_PATH
-            media_type=media_data["type"].upper(),
-            file_size=media_data["file_size"],
-            source_url=url
+        files = media_data["files"]
+        hashes = [f["file_hash"] for f in files]
+
+        platform = platform_for(url)
+        rows = []
+        seen = set()
+        for f in files:
+            if f["file_hash"] in seen:
+                continue  # même fichier deux fois dans un post
+            seen.add(f["file_hash"])
+            rows.append({
+                "id": uuid.uuid4(),
+                "file_hash": f["file_hash"],
+                "file_path": f["filename"],  # path is relative to NAS_MEDIA_PATH
+                "media_type": f["type"].upper(),
+                "file_size": f["file_size"],
+                "source_url": source_url,
+                "extractor": media_data.get("extractor"),
+                "extractor_id": media_data.get("extractor_id"),
+                "platform": platform,
+                "post_index": f["post_index"],
+                "meta": f["metadata"],
+                **f["fields"],
+            })
+
+        # Politique optionnelle : pas de ré-ingestion d'un quasi-doublon (ré-encodage, redimensionnement...)
+        frames_by_hash = {}
+        near_duplicates = []
+        if settings.NEAR_DUPLICATE_SKIP:
+            rows, near_duplicates, frames_by_hash = await drop_near_duplicates(ctx, rows)
+
+        # INSERT ... ON CONFLICT (file_hash) DO NOTHING RETURNING : la contrainte
+        # unique départage les workers concurrents, sans SELECT préalable
+        with timer.stage("db_write"):
+            inserted = await ctx['media_writer'].write(rows)
+        rows = [row for row in rows if row["file_hash"] in inserted]
+        if rows:
+            await bump_library_version(ctx['redis'])
+
+        if not rows:
+            logger.warning(f"👍 Fichier(s) déjà existant(s) (hash: {hashes[0]}). Pas d'ajout en BDD.")
+            if not near_duplicates:
+                await dedup.remember(hashes[0], normalized_url=source_url)
+            return await finish({"status": "skipped", "reason": "near_duplicate" if near_duplicates else "duplicate",
+                                 "file_hash": hashes[0], "file_hashes": hashes, "near_duplicates": near_duplicates,
+                                 "timings": timer.as_dict()})
+
+        await dedup.remember(
+            hashes[0],
+            normalized_url=source_url,
+            extractor=media_data.get("extractor"),
+            extractor_id=media_data.get("extractor_id"),
         )
-        
-        db_session.add(new_media)
-        await db_session.commit()
-        
-        logger.info(f"✅ Téléchargement et enregistrement réussis pour: {url}")
-        return {"status": "success", "file_hash": new_media.file_hash}
 
+        for row in rows:
+            # Previews (poster, miniature, sprite) et index perceptuel en tâche de fond :
+            # le slot du job est libéré tout de suite
+            schedule_previews(ctx, row["file_hash"], row["file_path"], row["media_type"])
+            schedule_background(ctx, index_phashes(ctx, row, frames_by_hash.get(row["file_hash"])))
+
+        # Conversion web (MP4/H.264) déléguée à la file CPU, par hash, pour chaque vidéo du post.
+        # Codecs connus seulement pour un fichier yt-dlp ; sinon le worker de transcodage sonde le fichier.
+        codecs = media_data.get("codecs") if len(files) == 1 else None
+        for row in rows:
+            if row["media_type"] == "VIDEO" and not is_web_compatible(codecs):
+                await enqueue_transcode(ctx['redis'], row["file_hash"])
+
+        logger.info(f"✅ Téléchargement et enregistrement réussis pour: {url} ({len(rows)} nouveau(x) fichier(s))")
+        return await finish({
+            "status": "success",
+            "file_hash": hashes[0],
+            "file_hashes": hashes,
+            "inserted": len(rows),
+            "duplicates": len(files) - len(rows) - len(near_duplicates),
+            "near_duplicates": near_duplicates,
+            "timings": timer.as_dict(),
+        })
+
+    except Retry:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur lors du traitement de {url}: {e}", exc_info=True)
-        await db_session.rollback()
+        JOBS.labels("failed", host).inc()
+        await progress.close("failed", error=str(e)[:500])
         # Optionally, re-raise to have Arq mark the job as failed
         raise
     finally:
-        await db_session.close()
+        if slot_acquired:
+            RUNNING.dec()
+            await scheduler.release(host, ctx['job_id'])
+
+
+def schedule_background(ctx, coro) -> None:
+    task = asyncio.create_task(coro)
+    ctx['preview_tasks'].add(task)
+    task.add_done_callback(ctx['preview_tasks'].discard)
+
+
+def schedule_previews(ctx, file_hash: str, file_path: str, media_type: str) -> None:
+    schedule_background(ctx, build_previews(ctx['preview_pool'], file_hash, file_path, media_type))
+
+
+async def index_phashes(ctx, row: dict, frames: Optional[List[FrameHash]] = None) -> None:
+    """Stores the perceptual hashes of a new media (computed here unless already known)."""
+    if frames is None:
+        frames = await build_phashes(ctx['preview_pool'], row["file_path"], row["media_type"])
+    if not frames:
+        return
+    try:
+        async with AsyncSessionLocal() as session:
+            await store_phashes(session, row["id"], frames)
+            await session.commit()
+        await bump_library_version(ctx['redis'])
+    except Exception as e:
+        logger.warning(f"🔍 Index perceptuel non enregistré pour {row['file_hash']}: {e}")
+
+
+async def drop_near_duplicates(ctx, rows: List[dict]) -> Tuple[List[dict], List[dict], Dict[str, List[FrameHash]]]:
+    """
+    Splits `rows` into the ones to ingest and the near-duplicates of media
+    already in the library, whose stored file is removed.
+    Returns (rows to insert, skipped near-duplicates, frame hashes by file hash).
+    """
+    all_frames = await asyncio.gather(
+        *(build_phashes(ctx['preview_pool'], row["file_path"], row["media_type"]) for row in rows)
+    )
+    frames_by_hash = {row["file_hash"]: frames for row, frames in zip(rows, all_frames) if frames}
+
+    kept, skipped = [], []
+    async with AsyncSessionLocal() as session:
+        # Un fichier identique déjà en base partage le même chemin : ni quasi-doublon, ni suppression
+        existing = set((await session.execute(
+            select(Media.file_hash).where(Media.file_hash.in_([row["file_hash"] for row in rows]))
+        )).scalars().all())
+        for row in rows:
+            frames = frames_by_hash.get(row["file_hash"])
+            if row["file_hash"] in existing or not frames:
+                kept.append(row)
+                continue
+            matches = await find_similar(
+                session, [phash for _, phash, _ in frames], settings.NEAR_DUPLICATE_MAX_DISTANCE, limit=1
+            )
+            if matches and matches[0][2] >= settings.NEAR_DUPLICATE_MIN_MATCH:
+                media_id, distance, _ = matches[0]
+                logger.info(f"🪞 Quasi-doublon de {media_id} (distance {distance}), ignoré: {row['file_path']}")
+                media_abspath(row["file_path"]).unlink(missing_ok=True)
+                skipped.append({"file_hash": row["file_hash"], "similar_to": str(media_id), "distance": distance})
+            else:
+                kept.append(row)
+    return kept, skipped, frames_by_hash
+
+
+async def startup(ctx):
+    ctx['scheduler'] = HostScheduler(ctx['redis'])
+    ctx['preview_pool'] = create_preview_pool()
+    ctx['preview_tasks'] = set()
+    ctx['media_writer'] = create_media_writer()
+    await ctx['media_writer'].start()
+    ctx['lane_dispatcher'] = LaneDispatcher(ctx['redis'])
+    ctx['lane_dispatcher'].start()
+    start_metrics_server()
+    # yt-dlp et gallery-dl importés et chauds avant le premier job
+    ctx['ydl_pool'] = YoutubeDLPool(settings.YTDLP_POOL_IDLE)
+    await ctx['ydl_pool'].warm(settings.YTDLP_PRELOAD_EXTRACTORS)
+    ctx['gallery_dl_pool'] = None
+    if settings.GALLERY_DL_HELPERS:
+        ctx['gallery_dl_pool'] = GalleryDlPool(settings.GALLERY_DL_HELPERS)
+        await ctx['gallery_dl_pool'].start(settings.GALLERY_DL_HELPERS)
+
+
+async def shutdown(ctx):
+    if ctx.get('gallery_dl_pool'):
+        await ctx['gallery_dl_pool'].close()
+    if ctx.get('ydl_pool'):
+        ctx['ydl_pool'].close()
+    if ctx.get('lane_dispatcher'):
+        await ctx['lane_dispatcher'].stop()
+    if ctx.get('media_writer'):
+        await ctx['media_writer'].close()
+    if ctx.get('preview_tasks'):
+        await asyncio.gather(*ctx['preview_tasks'], return_exceptions=True)
+    if ctx.get('preview_pool'):
+        ctx['preview_pool'].shutdown()
+
+
+async def count_finished_job(ctx):
+    """
+    Adds a finished job to the complete / failed totals and to the list of
+    recently finished jobs the API reports. Runs once arq has stored the
+    result; a deferred (Retry) job has none yet.
+    """
+    try:
+        raw = await ctx['redis'].get(result_key_prefix + ctx['job_id'])
+        if raw is None:
+            return
+        state = "complete" if deserialize_result(raw).success else "failed"
+        now_ms = timestamp_ms()
+        async with ctx['redis'].pipeline(transaction=False) as pipe:
+            pipe.hincrby(JOB_COUNTS_KEY, state, 1)
+            pipe.zadd(FINISHED_KEY_PREFIX + state, {ctx['job_id']: now_ms})
+            pipe.zremrangebyscore(FINISHED_KEY_PREFIX + state, "-inf", now_ms - FINISHED_RETENTION_MS)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Compteur de jobs non mis à jour ({ctx['job_id']}): {e}")
 
 
 # Arq worker settings
@@ -76,5 +321,15 @@ class WorkerSettings:
     # Redis connection settings
     redis_settings = RedisSettings(host=redis_url.hostname, port=redis_url.port)
     
-    # Name of the queue to listen to
-    queue_name = "arq:queue"
+    # Name of the queue to listen to (fed from the priority lanes, see lanes.py)
+    queue_name = DOWNLOAD_QUEUE
+
+    on_startup = startup
+    on_shutdown = shutdown
+    after_job_end = count_finished_job
+
+    # Jobs for a saturated host defer themselves (Retry) instead of holding a
+    # slot, so max_jobs is spent on hosts that can actually make progress.
+    max_jobs = settings.WORKER_MAX_JOBS
+    job_timeout = settings.JOB_TIMEOUT
+    max_tries = settings.SCHEDULER_MAX_DEFERRALS
@@ -0,0 +1,69 @@
+"""
+Searchable fields (title, uploader, duration, tags, description) from a
+yt-dlp info dict or a gallery-dl metadata file, stored on `Media`.
+"""
+from typing import Any, Dict, List, Optional
+
+TITLE_MAX_LENGTH = 500
+DESCRIPTION_MAX_LENGTH = 10_000
+MAX_TAGS = 100
+
+
+def _text(value: Any, max_length: int) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value[:max_length] or None
+
+
+def _tags(values: Any) -> Optional[List[str]]:
+    if not values:
+        return None
+    if isinstance(values, str):
+        values = [values]
+    tags = []
+    for value in values:
+        # pixiv : [{"name": ..., "translated_name": ...}], ailleurs des chaînes
+        if isinstance(value, dict):
+            value = value.get("name") or value.get("tag")
+        value = _text(value, 100)
+        value = value.lstrip("#") if value else None
+        if value and value not in tags:
+            tags.append(value)
+    return tags[:MAX_TAGS] or None
+
+
+def _first(meta: Dict[str, Any], *keys: str) -> Any:
+    for key in keys:
+        value = meta.get(key)
+        if isinstance(value, dict):
+            value = value.get("nick") or value.get("name")
+        if value:
+            return value
+    return None
+
+
+def ytdlp_fields(info: Dict[str, Any]) -> Dict[str, Any]:
+    duration = info.get("duration")
+    return {
+        "title": _text(info.get("title"), TITLE_MAX_LENGTH),
+        "uploader": _text(info.get("uploader") or info.get("channel") or info.get("uploader_id"), 200),
+        "duration": float(duration) if duration else None,
+        "tags": _tags((info.get("tags") or []) + (info.get("categories") or [])),
+        "description": _text(info.get("description"), DESCRIPTION_MAX_LENGTH),
+    }
+
+
+def gallery_fields(meta: Optional[Dict[str, Any]], fallback_title: Optional[str] = None) -> Dict[str, Any]:
+    """Fields from a gallery-dl --write-metadata file; key names differ between extractors."""
+    meta = meta or {}
+    description = _first(meta, "content", "description", "caption", "selftext")
+    title = _first(meta, "title") or (str(description).splitlines()[0] if description else None) or fallback_title
+    duration = meta.get("duration")
+    return {
+        "title": _text(title, TITLE_MAX_LENGTH),
+        "uploader": _text(_first(meta, "author", "user", "owner", "username", "uploader"), 200),
+        "duration": float(duration) if isinstance(duration, (int, float)) and duration else None,
+        "tags": _tags(meta.get("tags") or meta.get("hashtags")),
+        "description": _text(description, DESCRIPTION_MAX_LENGTH),
+    }
@@ -0,0 +1,66 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Du probe (~100 ms) au téléchargement d'une longue vidéo (JOB_TIMEOUT)
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    "mediafetcher_stage_seconds", "Duration of each stage of a download job", ["stage"], buckets=STAGE_BUCKETS,
+)
+BYTES = Counter(
+    "mediafetcher_downloaded_bytes_total", "Bytes stored in the library", ["extractor", "domain"],
+)
+FAILURES = Counter(
+    "mediafetcher_extractor_failures_total", "Failed yt-dlp / gallery-dl attempts", ["extractor", "domain"],
+)
+FALLBACKS = Counter(
+    "mediafetcher_extractor_fallbacks_total", "Failed attempts retried with the other tool", ["extractor", "domain"],
+)
+JOBS = Counter("mediafetcher_jobs_total", "Finished download jobs", ["status", "domain"])
+# Par processus ; les files et le total du cluster sont exportés par l'API (backend/app/metrics.py)
+RUNNING = Gauge("mediafetcher_worker_jobs_running", "Download jobs running in this worker process")
+
+
+class StageTimer:
+    """
+    Durations of the stages of one job: observed in STAGE_SECONDS as they end
+    and kept for the job result (`timings`).
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        STAGE_SECONDS.labels(name).observe(seconds)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {name: round(seconds, 3) for name, seconds in self.seconds.items()}
+
+
+def start_metrics_server() -> None:
+    """Serves /metrics on METRICS_PORT from prometheus_client's own thread (0 = disabled)."""
+    if not settings.METRICS_PORT:
+        return
+    try:
+        start_http_server(settings.METRICS_PORT)
+    except OSError as e:
+        logger.warning(f"📈 Endpoint /metrics indisponible sur le port {settings.METRICS_PORT}: {e}")
+        return
+    logger.info(f"📈 Métriques Prometheus sur :{settings.METRICS_PORT}/metrics")
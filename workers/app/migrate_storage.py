@@ -0,0 +1,106 @@
+"""
+Moves stored files to the current storage layout (STORAGE_SHARD_DEPTH /
+STORAGE_SHARD_WIDTH, see paths.py) and updates `file_path` in the database.
+
+    python -m app.migrate_storage [--batch-size 500] [--concurrency 16]
+
+Media and rendition rows are walked by id (keyset). Files are renamed in
+parallel within NAS_MEDIA_PATH, then each batch of paths is updated in one
+statement. Rows already at their target path are skipped, and a file found
+at its target but not at its old path (interrupted run) only gets its row
+updated, so the tool can be interrupted and re-run at any time, also while
+workers are running.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from pathlib import PurePosixPath
+from typing import Optional
+
+from redis.asyncio import Redis
+from sqlalchemy import select, update
+
+from .cache import bump_library_version
+from .config import settings
+from .database import AsyncSessionLocal
+from .models import Media, MediaRendition
+from .paths import media_abspath, media_relpath
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _move(file_path: str, target: str) -> bool:
+    """Renames one file to its target path; returns False when it is nowhere to be found."""
+    src = media_abspath(file_path)
+    dest = media_abspath(target)
+    if not src.exists():
+        return dest.exists()
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(src, dest)
+    return True
+
+
+async def migrate_table(model, batch_size: int, concurrency: int, redis) -> None:
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    moved = missing = 0
+
+    async def move(row_id, file_path: str, target: str) -> Optional[dict]:
+        nonlocal moved, missing
+        async with semaphore:
+            if await loop.run_in_executor(None, _move, file_path, target):
+                moved += 1
+                return {"id": row_id, "file_path": target}
+            missing += 1
+            logger.warning(f"⚠️ Fichier introuvable, ligne laissée telle quelle: {file_path}")
+            return None
+
+    last_id = None
+    while True:
+        stmt = select(model.id, model.file_hash, model.file_path).order_by(model.id).limit(batch_size)
+        if last_id is not None:
+            stmt = stmt.where(model.id > last_id)
+        async with AsyncSessionLocal() as session:
+            batch = (await session.execute(stmt)).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        todo = []
+        for row in batch:
+            target = media_relpath(row.file_hash, PurePosixPath(row.file_path).suffix)
+            if row.file_path != target:
+                todo.append(move(row.id, row.file_path, target))
+        changes = [c for c in await asyncio.gather(*todo) if c]
+
+        if changes:
+            async with AsyncSessionLocal() as session:
+                # Bulk UPDATE by primary key: one executemany for the whole batch
+                await session.execute(update(model), changes)
+                await session.commit()
+            # Le cache de l'API garde sinon les anciens chemins
+            await bump_library_version(redis)
+        logger.info(f"📦 {model.__tablename__}: {moved} fichier(s) déplacé(s), {missing} introuvable(s) (dernier id: {last_id})")
+
+
+async def migrate(batch_size: int, concurrency: int) -> None:
+    redis = Redis.from_url(settings.REDIS_URL)
+    try:
+        for model in (Media, MediaRendition):
+            await migrate_table(model, batch_size, concurrency, redis)
+    finally:
+        await redis.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch_size, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
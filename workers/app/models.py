@@ -6,10 +6,15 @@ from sqlalchemy import (
     ForeignKey,
     Enum,
     BigInteger,
-    Table
+    Integer,
+    Float,
+    Text,
+    Table,
+    Index,
+    UniqueConstraint
 )
-from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import deferred, relationship
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR, UUID
 from sqlalchemy.sql import func
 
 # Note: The Base is imported from the worker's own database session setup
@@ -18,7 +23,9 @@ from .database import Base
 # Junction table for the many-to-many relationship between Media and Folder
 media_folders = Table('media_folders', Base.metadata,
     Column('media_id', UUID(as_uuid=True), ForeignKey('media.id', ondelete='CASCADE'), primary_key=True),
-    Column('folder_id', UUID(as_uuid=True), ForeignKey('folders.id', ondelete='CASCADE'), primary_key=True)
+    Column('folder_id', UUID(as_uuid=True), ForeignKey('folders.id', ondelete='CASCADE'), primary_key=True),
+    # The primary key leads with media_id: folder listings need their own index
+    Index('ix_media_folders_folder_id', 'folder_id'),
 )
 
 class Media(Base):
@@ -30,20 +37,79 @@ class Media(Base):
     # The Enum needs to be created on the DB, ensure the backend does this.
     media_type = Column(Enum('VIDEO', 'IMAGE', 'AUDIO', name='media_type_enum'), nullable=False)
     file_size = Column(BigInteger, nullable=False)
-    source_url = Column(String, nullable=True)
+    source_url = Column(String, nullable=True, index=True)  # normalized, see urls.normalize_url
+    # yt-dlp extractor key + video id from the probe, used for pre-download dedup
+    extractor = Column(String, nullable=True)
+    extractor_id = Column(String, nullable=True)
+    platform = Column(String, nullable=True)  # see urls.platform_for
+    # Multi-file posts (carousels, threads): position in the post + gallery-dl metadata
+    post_index = Column(Integer, nullable=True)
+    meta = Column(JSONB, nullable=True)
+    # Searchable metadata from yt-dlp / gallery-dl (see metadata.py in the worker)
+    title = Column(String, nullable=True)
+    uploader = Column(String, nullable=True)
+    duration = Column(Float, nullable=True)  # seconds
+    tags = Column(ARRAY(String), nullable=True)
+    description = Column(Text, nullable=True)
+    # Maintained by the media_search_vector trigger (database.SCHEMA_UPGRADES)
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index('ix_media_extractor_extractor_id', 'extractor', 'extractor_id'),
+        # Keyset pagination of the feed (ORDER BY created_at DESC, id DESC) and its filters
+        Index('ix_media_created_at_id', 'created_at', 'id'),
+        Index('ix_media_media_type_created_at_id', 'media_type', 'created_at', 'id'),
+        Index('ix_media_platform_created_at_id', 'platform', 'created_at', 'id'),
+        # Full-text search (GET /api/search) and fuzzy title matching (pg_trgm)
+        Index('ix_media_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_media_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+    )
+
     # This relationship is primarily for the backend API, but defined here for consistency
     folders = relationship("Folder",
                            secondary=media_folders,
                            back_populates="media_items")
+    renditions = relationship("MediaRendition", back_populates="media", cascade="all, delete-orphan")
+
+class MediaRendition(Base):
+    """A web-playable version (e.g. H.264/AAC MP4) of a stored media, produced by the transcode worker."""
+    __tablename__ = "media_renditions"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    media_id = Column(UUID(as_uuid=True), ForeignKey('media.id', ondelete='CASCADE'), nullable=False)
+    profile = Column(String, nullable=False)
+    file_hash = Column(String, nullable=False)
+    file_path = Column(String, nullable=False)
+    file_size = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    media = relationship("Media", back_populates="renditions")
+
+    __table_args__ = (
+        UniqueConstraint('media_id', 'profile', name='uq_media_renditions_media_id_profile'),
+    )
+
+class MediaPHash(Base):
+    """Perceptual hash of an image or of one video frame (see similarity.py)."""
+    __tablename__ = "media_phashes"
+
+    media_id = Column(UUID(as_uuid=True), ForeignKey('media.id', ondelete='CASCADE'), primary_key=True)
+    seq = Column(Integer, primary_key=True)  # frame index, 0 for images
+    phash = Column(BigInteger, nullable=False)
+    dhash = Column(BigInteger, nullable=False)
+    # 16-bit slices of phash, one index each (multi-index hashing)
+    chunk0 = Column(Integer, nullable=False, index=True)
+    chunk1 = Column(Integer, nullable=False, index=True)
+    chunk2 = Column(Integer, nullable=False, index=True)
+    chunk3 = Column(Integer, nullable=False, index=True)
 
 class Folder(Base):
     __tablename__ = "folders"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False)
-    parent_id = Column(UUID(as_uuid=True), ForeignKey('folders.id'), nullable=True)
+    parent_id = Column(UUID(as_uuid=True), ForeignKey('folders.id'), nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     media_items = relationship("Media",
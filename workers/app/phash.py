@@ -0,0 +1,107 @@
+"""
+Perceptual hashes (64-bit pHash + dHash) of images and video frames.
+
+Like previews.py, this module only depends on the stdlib, Pillow and the
+ffmpeg/ffprobe binaries, and runs in the preview process pool.
+"""
+import math
+import subprocess
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+from PIL import Image
+
+from .previews import _probe_duration
+
+PHASH_SIZE = 32  # side of the grayscale image the DCT is computed on
+PHASH_LOW = 8  # low-frequency block kept: 8x8 = 64 bits
+VIDEO_FRAMES = 16  # frames hashed per video, evenly spaced
+MIN_FRAME_INTERVAL = 0.5  # secondes entre deux images hachées au minimum
+
+# (frame index, phash, dhash), hashes as unsigned 64-bit ints
+FrameHash = Tuple[int, int, int]
+
+
+@lru_cache(maxsize=1)
+def _dct_table() -> List[List[float]]:
+    n = PHASH_SIZE
+    return [[math.cos((2 * x + 1) * u * math.pi / (2 * n)) for x in range(n)] for u in range(PHASH_LOW)]
+
+
+def _bits(values: Sequence[bool]) -> int:
+    h = 0
+    for v in values:
+        h = (h << 1) | int(v)
+    return h
+
+
+def phash_pixels(pixels: Sequence[int]) -> int:
+    """pHash of a PHASH_SIZE x PHASH_SIZE grayscale image given row by row."""
+    n, table = PHASH_SIZE, _dct_table()
+    rows = [pixels[y * n:(y + 1) * n] for y in range(n)]
+    # 2D DCT, low frequencies only: rows first, then columns
+    row_dct = [[sum(c * p for c, p in zip(table[u], row)) for u in range(PHASH_LOW)] for row in rows]
+    coeffs = [
+        sum(table[v][y] * row_dct[y][u] for y in range(n))
+        for v in range(PHASH_LOW) for u in range(PHASH_LOW)
+    ]
+    # The DC term only carries mean brightness: left out of the median
+    median = sorted(coeffs[1:])[len(coeffs[1:]) // 2]
+    return _bits(c > median for c in coeffs)
+
+
+def dhash_image(image: Image.Image) -> int:
+    """dHash: brightness gradient between horizontal neighbours on a 9x8 image."""
+    small = image.convert("L").resize((PHASH_LOW + 1, PHASH_LOW), Image.LANCZOS)
+    px = list(small.getdata())
+    w = PHASH_LOW + 1
+    return _bits(px[y * w + x] < px[y * w + x + 1] for y in range(PHASH_LOW) for x in range(PHASH_LOW))
+
+
+def _hash_gray(image: Image.Image) -> Tuple[int, int]:
+    gray = image.convert("L")
+    small = gray.resize((PHASH_SIZE, PHASH_SIZE), Image.LANCZOS)
+    return phash_pixels(list(small.getdata())), dhash_image(gray)
+
+
+def _image_hashes(src: str) -> List[FrameHash]:
+    with Image.open(src) as img:
+        img.seek(0)  # GIF / WebP animés : première image
+        return [(0, *_hash_gray(img))]
+
+
+def _frame_times(duration: float) -> List[float]:
+    """
+    Timestamps of the hashed frames, fixed fractions of the duration: two
+    encodes of a video (other GOP, bitrate, size) get the same frames.
+    """
+    if duration <= 0:
+        return [float(i) for i in range(VIDEO_FRAMES)]  # durée inconnue : une image par seconde
+    count = max(1, min(VIDEO_FRAMES, int(duration / MIN_FRAME_INTERVAL)))
+    return [duration * (i + 0.5) / count for i in range(count)]
+
+
+def _video_hashes(src: str) -> List[FrameHash]:
+    frame_size = PHASH_SIZE * PHASH_SIZE
+    hashes = []
+    for i, t in enumerate(_frame_times(_probe_duration(src))):
+        # Seek précis (image exacte à t, pas l'image clé précédente), réduite en 32x32 gris par ffmpeg
+        frame = subprocess.run(
+            ["ffmpeg", "-nostdin", "-v", "error", "-ss", f"{t:.3f}", "-i", src, "-frames:v", "1",
+             "-vf", f"scale={PHASH_SIZE}:{PHASH_SIZE}:flags=area,format=gray", "-f", "rawvideo", "-"],
+            capture_output=True, check=True,
+        ).stdout[:frame_size]
+        if len(frame) < frame_size:
+            break  # au-delà de la fin (durée inconnue ou surestimée)
+        image = Image.frombytes("L", (PHASH_SIZE, PHASH_SIZE), frame)
+        hashes.append((i, phash_pixels(frame), dhash_image(image)))
+    return hashes
+
+
+def compute_phashes(src: str, media_type: str) -> List[FrameHash]:
+    """Perceptual hashes of one stored file: one entry per image, up to VIDEO_FRAMES per video."""
+    if media_type.upper() == "VIDEO":
+        return _video_hashes(src)
+    if media_type.upper() == "IMAGE":
+        return _image_hashes(src)
+    return []
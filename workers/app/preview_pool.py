@@ -0,0 +1,48 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+from .paths import media_abspath
+from .phash import FrameHash, compute_phashes
+from .previews import generate_previews
+
+logger = logging.getLogger(__name__)
+
+
+def create_preview_pool() -> ProcessPoolExecutor:
+    """
+    Bounded process pool for ffmpeg/Pillow work, so previews never compete
+    with downloads for the worker's event loop or threads.
+    """
+    # spawn : les process enfants ne dupliquent pas l'état asyncio/threads du worker
+    return ProcessPoolExecutor(
+        max_workers=settings.PREVIEW_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+async def build_previews(pool: ProcessPoolExecutor, file_hash: str, file_path: str,
+                         media_type: str) -> Optional[Dict[str, Any]]:
+    """Generates the previews of one stored file in `pool`. Failures are logged, never raised."""
+    loop = asyncio.get_running_loop()
+    src = str(media_abspath(file_path))
+    try:
+        return await loop.run_in_executor(
+            pool, generate_previews, src, media_type, settings.NAS_MEDIA_PATH, file_hash
+        )
+    except Exception as e:
+        logger.warning(f"🖼️ Previews impossibles pour {file_hash}: {e}")
+        return None
+
+
+async def build_phashes(pool: ProcessPoolExecutor, file_path: str, media_type: str) -> Optional[List[FrameHash]]:
+    """Perceptual hashes of one stored file, computed in `pool`. Failures are logged, never raised."""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(pool, compute_phashes, str(media_abspath(file_path)), media_type)
+    except Exception as e:
+        logger.warning(f"🔍 Hash perceptuel impossible pour {file_path}: {e}")
+        return None
@@ -0,0 +1,130 @@
+"""
+Poster frame, WebP thumbnail and seek-preview sprite generation.
+
+The functions in this module are CPU-bound and run in a process pool
+(see `main.startup`); they only depend on the stdlib, Pillow and the
+ffmpeg/ffprobe binaries so that pool processes start cheaply.
+"""
+import json
+import math
+import os
+import subprocess
+from pathlib import Path
+from typing import Any, Dict
+
+from PIL import Image
+
+PREVIEWS_DIRNAME = ".previews"
+
+THUMB_SIZE = (320, 320)
+POSTER_MAX_SIZE = (1280, 1280)
+SPRITE_TILE_WIDTH = 160
+SPRITE_COLUMNS = 10
+SPRITE_MAX_TILES = 100
+SPRITE_MIN_INTERVAL = 2.0  # secondes entre deux vignettes au minimum
+
+
+def preview_dir(media_root: str, file_hash: str) -> Path:
+    """Content-addressed preview folder: <root>/.previews/<h[:2]>/<hash>/."""
+    return Path(media_root) / PREVIEWS_DIRNAME / file_hash[:2] / file_hash
+
+
+def _probe_duration(src: str) -> float:
+    out = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=nw=1:nk=1", src],
+        capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    try:
+        return float(out)
+    except ValueError:
+        return 0.0
+
+
+def _ffmpeg(*args: str) -> None:
+    subprocess.run(["ffmpeg", "-nostdin", "-v", "error", "-y", *args], capture_output=True, check=True)
+
+
+def _save_thumb(image: Image.Image, dest: Path) -> None:
+    image = image.convert("RGB")
+    image.thumbnail(THUMB_SIZE)
+    image.save(dest, "WEBP", quality=75, method=4)
+
+
+def _video_previews(src: str, out: Path) -> Dict[str, Any]:
+    duration = _probe_duration(src)
+
+    # Poster : une image à 10 % de la durée (évite les écrans noirs d'intro)
+    poster = out / "poster.jpg"
+    _ffmpeg("-ss", f"{duration * 0.1:.3f}", "-i", src, "-frames:v", "1",
+            "-vf", f"scale='min({POSTER_MAX_SIZE[0]},iw)':-2", "-q:v", "3", str(poster))
+    with Image.open(poster) as img:
+        _save_thumb(img, out / "thumb.webp")
+
+    result: Dict[str, Any] = {"poster": poster.name, "thumb": "thumb.webp"}
+    if duration <= 0:
+        return result
+
+    # Sprite de prévisualisation pour la barre de lecture : une vignette tous les `interval` s
+    interval = max(SPRITE_MIN_INTERVAL, duration / SPRITE_MAX_TILES)
+    tiles = max(1, min(SPRITE_MAX_TILES, int(duration // interval)))
+    columns = min(SPRITE_COLUMNS, tiles)
+    rows = math.ceil(tiles / columns)
+    sprite = out / "sprite.jpg"
+    _ffmpeg("-i", src, "-frames:v", "1", "-q:v", "5",
+            "-vf", f"fps=1/{interval:.3f},scale={SPRITE_TILE_WIDTH}:-2,tile={columns}x{rows}", str(sprite))
+    with Image.open(sprite) as img:
+        tile_height = img.height // rows
+    (out / "sprite.json").write_text(json.dumps({
+        "image": sprite.name,
+        "interval": interval,
+        "tiles": tiles,
+        "columns": columns,
+        "rows": rows,
+        "tile_width": SPRITE_TILE_WIDTH,
+        "tile_height": tile_height,
+    }))
+    result.update(sprite=sprite.name, sprite_meta="sprite.json")
+    return result
+
+
+def _image_previews(src: str, out: Path) -> Dict[str, Any]:
+    with Image.open(src) as img:
+        img.seek(0)  # GIF / WebP animés : première image
+        frame = img.convert("RGB")
+    _save_thumb(frame, out / "thumb.webp")
+    frame.thumbnail(POSTER_MAX_SIZE)
+    frame.save(out / "poster.jpg", "JPEG", quality=85)
+    return {"poster": "poster.jpg", "thumb": "thumb.webp"}
+
+
+def generate_previews(src: str, media_type: str, media_root: str, file_hash: str) -> Dict[str, Any]:
+    """
+    Builds the previews of one stored file. Outputs are keyed by file hash,
+    so an existing preview folder is a cache hit and nothing is recomputed.
+    """
+    out = preview_dir(media_root, file_hash)
+    if (out / "thumb.webp").exists():
+        return {"cached": True}
+    if media_type.upper() not in ("VIDEO", "IMAGE"):
+        return {"skipped": media_type}
+
+    # Génération dans un dossier temporaire puis rename : jamais de preview partielle visible
+    tmp = out.with_name(f".{file_hash}.{os.getpid()}.tmp")
+    tmp.mkdir(parents=True, exist_ok=True)
+    try:
+        if media_type.upper() == "VIDEO":
+            result = _video_previews(src, tmp)
+        else:
+            result = _image_previews(src, tmp)
+        try:
+            os.replace(tmp, out)
+        except OSError:
+            # Un autre process a fini le même hash avant nous
+            if not (out / "thumb.webp").exists():
+                raise
+    finally:
+        if tmp.exists():
+            for f in tmp.iterdir():
+                f.unlink()
+            tmp.rmdir()
+    return result
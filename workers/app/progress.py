@@ -0,0 +1,89 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Un seul canal pour tous les jobs : le backend n'a qu'un abonnement Redis
+PROGRESS_CHANNEL = "jobs:progress"
+# Dernier état connu de chaque job (lecture par l'API de statut)
+PROGRESS_KEY_PREFIX = "jobs:progress:"
+
+
+class ProgressReporter:
+    """
+    Publishes the progress of one job to Redis pub/sub.
+
+    `update()` and `ytdlp_hook()` only record the latest state (they are
+    called from yt-dlp's download thread); a task on the event loop publishes
+    it at most every PROGRESS_INTERVAL seconds, so a fast download yields a
+    few messages per second instead of one per chunk.
+    """
+
+    def __init__(self, redis, job_id: str, url: str):
+        self.redis = redis
+        self.job_id = job_id
+        self.url = url
+        self._state: Dict[str, Any] = {"job_id": job_id, "url": url, "stage": "starting"}
+        self._dirty = True
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, **fields: Any) -> None:
+        with self._lock:
+            self._state.update(fields)
+            self._dirty = True
+
+    def ytdlp_hook(self, d: Dict[str, Any]) -> None:
+        """yt-dlp `progress_hooks` entry."""
+        status = d.get("status")
+        if status == "downloading":
+            self.update(
+                stage="downloading",
+                downloaded=d.get("downloaded_bytes"),
+                total=d.get("total_bytes") or d.get("total_bytes_estimate"),
+                speed=d.get("speed"),
+                eta=d.get("eta"),
+            )
+        elif status == "finished":
+            self.update(stage="processing", downloaded=d.get("downloaded_bytes") or d.get("total_bytes"))
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self, stage: str, **fields: Any) -> None:
+        """Stops the periodic publisher and publishes the final state right away."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.update(stage=stage, **fields)
+        await self._flush()
+
+    async def _run(self) -> None:
+        while True:
+            await self._flush()
+            await asyncio.sleep(settings.PROGRESS_INTERVAL)
+
+    async def _flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            self._state["ts"] = time.time()
+            payload = json.dumps(self._state)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.publish(PROGRESS_CHANNEL, payload)
+                pipe.set(PROGRESS_KEY_PREFIX + self.job_id, payload, ex=settings.PROGRESS_TTL)
+                await pipe.execute()
+        except Exception as e:
+            # La progression est best-effort : ne jamais faire échouer un téléchargement
+            logger.debug(f"Publication de progression impossible ({self.job_id}): {e}")
@@ -0,0 +1,120 @@
+import logging
+import math
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from .config import settings
+from .urls import host_key
+
+logger = logging.getLogger(__name__)
+
+ROUTING_KEY_PREFIX = "routing:"
+YTDLP = "ytdlp"
+GALLERY_DL = "gallerydl"
+BACKENDS = (YTDLP, GALLERY_DL)
+
+# Atomically decay every counter of a route to "now", then add one outcome.
+# Fields: "<backend>:ok" / "<backend>:fail" (decayed counts) and "ts" (seconds).
+RECORD_SCRIPT = """
+local key = KEYS[1]
+local field = ARGV[1]
+local half_life = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[3])
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local ts = tonumber(redis.call('HGET', key, 'ts'))
+if ts and half_life > 0 then
+    local factor = math.pow(0.5, math.max(0, now - ts) / half_life)
+    local values = redis.call('HGETALL', key)
+    for i = 1, #values, 2 do
+        if values[i] ~= 'ts' then
+            redis.call('HSET', key, values[i], tostring(tonumber(values[i + 1]) * factor))
+        end
+    end
+end
+
+redis.call('HINCRBYFLOAT', key, field, 1)
+redis.call('HSET', key, 'ts', tostring(now))
+redis.call('EXPIRE', key, ttl)
+return 1
+"""
+
+
+def route_keys(url: str) -> List[str]:
+    """
+    Routing keys for `url`, most specific first: "<site>/<kind>" then "<site>".
+
+    The kind is the last static-looking path segment that is followed by an
+    id, e.g. twitter.com/<user>/status/<id> -> "twitter.com/status",
+    instagram.com/p/<code> -> "instagram.com/p".
+    """
+    host = host_key(url)
+    segments = [s for s in urlsplit(url).path.split("/") if s]
+    kind = None
+    for segment in segments[:-1]:
+        if segment.isalpha() and segment.islower() and len(segment) <= 12:
+            kind = segment
+    if kind:
+        return [f"{host}/{kind}", host]
+    return [host]
+
+
+class ExtractorRouter:
+    """
+    Learns, per site and URL kind, whether yt-dlp or gallery-dl succeeds,
+    so image-only posts skip the doomed yt-dlp probe.
+
+    Outcomes are exponentially decayed counters (ROUTING_HALF_LIFE) kept in
+    Redis and shared by every worker. Without enough history for a route,
+    yt-dlp stays first, as before.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self._record = redis.register_script(RECORD_SCRIPT)
+
+    async def _stats(self, key: str) -> Optional[Dict[str, float]]:
+        raw = await self.redis.hgetall(ROUTING_KEY_PREFIX + key)
+        if not raw:
+            return None
+        values = {(k.decode() if isinstance(k, bytes) else k): float(v) for k, v in raw.items()}
+        ts = values.pop("ts", time.time())
+        if settings.ROUTING_HALF_LIFE > 0:
+            factor = math.pow(0.5, max(0.0, time.time() - ts) / settings.ROUTING_HALF_LIFE)
+            values = {k: v * factor for k, v in values.items()}
+        return values
+
+    @staticmethod
+    def _success_rate(stats: Dict[str, float], backend: str) -> float:
+        # Laplace smoothing: an untried backend scores 0.5
+        ok = stats.get(f"{backend}:ok", 0.0)
+        fail = stats.get(f"{backend}:fail", 0.0)
+        return (ok + 1) / (ok + fail + 2)
+
+    async def order(self, url: str) -> List[str]:
+        """Backends to try for `url`, most likely to succeed first."""
+        try:
+            for key in route_keys(url):
+                stats = await self._stats(key)
+                if not stats or sum(stats.values()) < settings.ROUTING_MIN_SAMPLES:
+                    continue
+                if self._success_rate(stats, GALLERY_DL) > self._success_rate(stats, YTDLP):
+                    return [GALLERY_DL, YTDLP]
+                return [YTDLP, GALLERY_DL]
+        except Exception as e:
+            logger.warning(f"Table de routage indisponible ({e}), yt-dlp en premier.")
+        return [YTDLP, GALLERY_DL]
+
+    async def record(self, url: str, backend: str, success: bool) -> None:
+        field = f"{backend}:{'ok' if success else 'fail'}"
+        try:
+            for key in route_keys(url):
+                await self._record(
+                    keys=[ROUTING_KEY_PREFIX + key],
+                    args=[field, settings.ROUTING_HALF_LIFE, settings.ROUTING_TTL],
+                )
+        except Exception as e:
+            logger.warning(f"Routage non enregistré pour {url}: {e}")
@@ -0,0 +1,102 @@
+import logging
+import random
+from typing import Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+SLOTS_KEY_PREFIX = "sched:slots:"
+BUCKET_KEY_PREFIX = "sched:bucket:"
+
+# Atomically: drop expired leases, check the host concurrency cap, then take
+# a token from the host bucket and register a lease for this job.
+# Returns 0 when granted, -1 when the host is saturated, otherwise the number
+# of milliseconds until the bucket has a token again.
+ACQUIRE_SCRIPT = """
+local slots = KEYS[1]
+local bucket = KEYS[2]
+local limit = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local lease_ms = tonumber(ARGV[4])
+local token = ARGV[5]
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+redis.call('ZREMRANGEBYSCORE', slots, '-inf', now)
+if redis.call('ZSCORE', slots, token) then
+    return 0
+end
+if limit > 0 and redis.call('ZCARD', slots) >= limit then
+    return -1
+end
+
+if rate > 0 then
+    local state = redis.call('HMGET', bucket, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+    if tokens < 1 then
+        redis.call('HSET', bucket, 'tokens', tostring(tokens), 'ts', now)
+        return math.ceil((1 - tokens) * 1000 / rate)
+    end
+    redis.call('HSET', bucket, 'tokens', tostring(tokens - 1), 'ts', now)
+    redis.call('PEXPIRE', bucket, math.ceil(burst * 1000 / rate) + 60000)
+end
+
+redis.call('ZADD', slots, now + lease_ms, token)
+redis.call('PEXPIRE', slots, lease_ms)
+return 0
+"""
+
+
+class HostScheduler:
+    """
+    Per-host concurrency caps and token-bucket rate limits, shared by every
+    worker process through Redis.
+
+    A job that cannot start is not held in its worker slot: `acquire` returns
+    how long to wait and the task defers itself (arq `Retry`), so the slot
+    goes to a job for another host.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self._acquire = redis.register_script(ACQUIRE_SCRIPT)
+
+    @staticmethod
+    def limits_for(host: str) -> Tuple[int, float]:
+        """Returns (max concurrent jobs, jobs per second) for `host`; 0 means unlimited."""
+        concurrency = settings.HOST_CONCURRENCY.get(host, settings.HOST_CONCURRENCY_DEFAULT)
+        rate = settings.HOST_RATE_LIMITS.get(host, settings.HOST_RATE_LIMIT_DEFAULT)
+        return concurrency, rate
+
+    async def acquire(self, host: str, token: str) -> float:
+        """
+        Tries to start a job for `host`. Returns 0 when the job may run now,
+        otherwise the number of seconds to defer it by.
+        """
+        concurrency, rate = self.limits_for(host)
+        if concurrency <= 0 and rate <= 0:
+            return 0.0
+
+        # Le bail expire avec le timeout du job : un worker tué ne bloque pas l'hôte.
+        lease_ms = (settings.JOB_TIMEOUT + 60) * 1000
+        wait_ms = await self._acquire(
+            keys=[SLOTS_KEY_PREFIX + host, BUCKET_KEY_PREFIX + host],
+            args=[concurrency, rate, max(settings.HOST_RATE_BURST, 1), lease_ms, token],
+        )
+        wait_ms = int(wait_ms)
+        if wait_ms == 0:
+            return 0.0
+        if wait_ms < 0:
+            delay = settings.SCHEDULER_RETRY_DELAY
+        else:
+            delay = wait_ms / 1000
+        # Jitter : évite que tous les jobs différés d'un hôte se réveillent ensemble
+        return delay * random.uniform(1.0, 1.5)
+
+    async def release(self, host: str, token: str) -> None:
+        await self.redis.zrem(SLOTS_KEY_PREFIX + host, token)
@@ -0,0 +1,111 @@
+"""
+Near-duplicate lookup on `media_phashes`, shared by the worker and the
+backend (keep both copies identical).
+
+Multi-index hashing: each 64-bit pHash is also stored as four indexed
+16-bit chunks. Two hashes within Hamming distance d differ by at most d // 4
+bits in one of their chunks (pigeonhole), so candidates come from B-tree
+lookups of each query chunk and of its values within that many bits,
+instead of a table scan, and only those are compared bit by bit. Recall is
+exact up to MAX_DISTANCE; larger distances are refused.
+"""
+import uuid
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import cast, func, literal, or_, select, union_all
+from sqlalchemy.dialects.postgresql import BIT, insert
+
+from .models import MediaPHash
+
+CHUNKS = 4
+CHUNK_BITS = 64 // CHUNKS
+# Chunk values probed around the query's: up to 2 flipped bits, 137 per chunk
+MAX_PROBE_BITS = 2
+# Largest distance at which every match is within MAX_PROBE_BITS of the query in some chunk
+MAX_DISTANCE = CHUNKS * (MAX_PROBE_BITS + 1) - 1
+
+
+def to_signed(h: int) -> int:
+    """Unsigned 64-bit hash -> value of a Postgres BIGINT with the same bits."""
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+
+def chunks(h: int) -> List[int]:
+    h &= (1 << 64) - 1
+    mask = (1 << CHUNK_BITS) - 1
+    return [(h >> (CHUNK_BITS * i)) & mask for i in range(CHUNKS)]
+
+
+def chunk_neighbours(value: int, bits: int) -> List[int]:
+    """Chunk values within `bits` flipped bits of `value`, `value` first."""
+    values = [value]
+    for flipped in range(1, bits + 1):
+        for positions in combinations(range(CHUNK_BITS), flipped):
+            values.append(value ^ sum(1 << p for p in positions))
+    return values
+
+
+def phash_rows(media_id: uuid.UUID, frames: Iterable[Tuple[int, int, int]]) -> List[Dict]:
+    rows = []
+    for seq, phash, dhash in frames:
+        row = {"media_id": media_id, "seq": seq, "phash": to_signed(phash), "dhash": to_signed(dhash)}
+        row.update({f"chunk{i}": c for i, c in enumerate(chunks(phash))})
+        rows.append(row)
+    return rows
+
+
+async def store_phashes(session, media_id: uuid.UUID, frames: Sequence[Tuple[int, int, int]]) -> None:
+    if not frames:
+        return
+    await session.execute(insert(MediaPHash).values(phash_rows(media_id, frames)).on_conflict_do_nothing())
+
+
+def _distance(phash: int):
+    return func.bit_count(cast(MediaPHash.phash.op("#")(to_signed(phash)), BIT(64)))
+
+
+async def find_similar(
+    session,
+    phashes: Sequence[int],
+    max_distance: int,
+    limit: int,
+    exclude_media_id: Optional[uuid.UUID] = None,
+) -> List[Tuple[uuid.UUID, int, float]]:
+    """
+    Media whose frames are within `max_distance` of the given pHashes.
+
+    Returns (media_id, best distance, share of the query frames matched),
+    best matches first.
+    """
+    if not 0 <= max_distance <= MAX_DISTANCE:
+        raise ValueError(f"max_distance must be between 0 and {MAX_DISTANCE}")
+    if not phashes:
+        return []
+    probe_bits = max_distance // CHUNKS
+    per_frame = []
+    for index, phash in enumerate(phashes):
+        distance = _distance(phash)
+        stmt = (
+            select(MediaPHash.media_id, literal(index).label("frame"), distance.label("distance"))
+            .where(or_(*(
+                getattr(MediaPHash, f"chunk{i}").in_(chunk_neighbours(c, probe_bits)) if probe_bits
+                else getattr(MediaPHash, f"chunk{i}") == c
+                for i, c in enumerate(chunks(phash))
+            )))
+            .where(distance <= max_distance)
+        )
+        if exclude_media_id is not None:
+            stmt = stmt.where(MediaPHash.media_id != exclude_media_id)
+        per_frame.append(stmt)
+
+    matches = union_all(*per_frame).subquery()
+    matched_frames = func.count(func.distinct(matches.c.frame))
+    stmt = (
+        select(matches.c.media_id, func.min(matches.c.distance), matched_frames)
+        .group_by(matches.c.media_id)
+        .order_by(matched_frames.desc(), func.min(matches.c.distance))
+        .limit(limit)
+    )
+    result = await session.execute(stmt)
+    return [(media_id, distance, frames / len(phashes)) for media_id, distance, frames in result.all()]
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from arq.connections import RedisSettings
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from .cache import bump_library_version
+from .config import settings
+from .database import AsyncSessionLocal
+from .downloader import MediaDownloader
+from .models import Media, MediaRendition
+from .paths import media_abspath
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# File dédiée au travail CPU : les transcodages n'occupent jamais un slot de téléchargement
+TRANSCODE_QUEUE = "arq:transcode"
+
+H264_PROFILE = "h264_mp4"
+PROFILES = {
+    H264_PROFILE: [
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "160k",
+        "-movflags", "+faststart",
+    ],
+}
+
+
+def is_web_compatible(codecs: Optional[Dict[str, Any]]) -> bool:
+    """
+    True when a download is already MP4 + H.264 (+ AAC), i.e. plays in every
+    browser. Unknown codecs (gallery-dl) count as incompatible: the transcode
+    task probes the stored file before converting anything.
+    """
+    if not codecs:
+        return False
+    vcodec = (codecs.get("vcodec") or "").lower()
+    acodec = (codecs.get("acodec") or "none").lower()
+    return (
+        codecs.get("ext") == "mp4"
+        and vcodec.startswith(("avc1", "h264"))
+        and (acodec == "none" or acodec.startswith(("mp4a", "aac")))
+    )
+
+
+async def probe_codecs(src: Path) -> Optional[Dict[str, Any]]:
+    """Container and codecs of a stored file, as is_web_compatible expects them; None if ffprobe fails."""
+    process = await asyncio.create_subprocess_exec(
+        "ffprobe", "-v", "error", "-show_entries", "stream=codec_type,codec_name", "-of", "json", str(src),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    stdout, _ = await process.communicate()
+    if process.returncode != 0:
+        return None
+    streams = json.loads(stdout or b"{}").get("streams", [])
+
+    def codec(kind: str) -> Optional[str]:
+        return next((st.get("codec_name") for st in streams if st.get("codec_type") == kind), None)
+
+    return {"ext": src.suffix.lstrip(".").lower(), "vcodec": codec("video"), "acodec": codec("audio") or "none"}
+
+
+def transcode_job_id(file_hash: str, profile: str) -> str:
+    # Id déterministe : arq refuse un 2e job identique déjà en file ou terminé
+    return f"transcode:{profile}:{file_hash}"
+
+
+async def enqueue_transcode(redis, file_hash: str, profile: str = H264_PROFILE) -> None:
+    job = await redis.enqueue_job(
+        "transcode_media_task", file_hash, profile,
+        _job_id=transcode_job_id(file_hash, profile),
+        _queue_name=TRANSCODE_QUEUE,
+    )
+    if job:
+        logger.info(f"🎞️ Transcodage {profile} demandé pour {file_hash}")
+
+
+async def transcode_media_task(ctx, file_hash: str, profile: str = H264_PROFILE):
+    """
+    Arq task producing the `profile` rendition of the media identified by
+    `file_hash`, unless that rendition already exists or the stored file
+    already plays in browsers.
+    """
+    # Sessions courtes : aucune connexion ni transaction ouverte pendant ffmpeg (jusqu'à TRANSCODE_TIMEOUT)
+    async with AsyncSessionLocal() as session:
+        media = (await session.execute(select(Media).where(Media.file_hash == file_hash))).scalars().first()
+        if media is None:
+            return {"status": "skipped", "reason": "unknown media", "file_hash": file_hash}
+
+        existing = await session.execute(
+            select(MediaRendition.file_hash)
+            .where(MediaRendition.media_id == media.id, MediaRendition.profile == profile)
+        )
+        if existing.scalar():
+            return {"status": "skipped", "reason": "rendition exists", "file_hash": file_hash}
+
+    src = media_abspath(media.file_path)
+    dest_path = Path(settings.NAS_MEDIA_PATH)
+
+    # Codecs réels du fichier stocké (inconnus pour gallery-dl, parfois approximatifs côté yt-dlp)
+    if is_web_compatible(await probe_codecs(src)):
+        return {"status": "skipped", "reason": "web compatible", "file_hash": file_hash}
+
+    with TemporaryDirectory(dir=MediaDownloader.staging_dir(dest_path)) as tmpdir:
+        output = Path(tmpdir) / f"{file_hash}.{profile}.mp4"
+        logger.info(f"🎞️ Transcodage {profile} de {media.file_path}")
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-nostdin", "-v", "error", "-y", "-i", str(src),
+            "-threads", str(settings.TRANSCODE_THREADS), *PROFILES[profile], str(output),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        _, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {stderr.decode()[-500:]}")
+
+        rendition_hash, final_destination, _ = await MediaDownloader.store_by_hash(output, dest_path)
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            insert(MediaRendition)
+            .values(
+                media_id=media.id,
+                profile=profile,
+                file_hash=rendition_hash,
+                file_path=final_destination.relative_to(dest_path).as_posix(),
+                file_size=final_destination.stat().st_size,
+            )
+            .on_conflict_do_nothing(constraint="uq_media_renditions_media_id_profile")
+        )
+        await session.commit()
+    await bump_library_version(ctx['redis'])
+
+    logger.info(f"✅ Rendition {profile} prête pour {file_hash}")
+    return {"status": "success", "file_hash": file_hash, "rendition_hash": rendition_hash}
+
+
+redis_url = urlparse(settings.REDIS_URL)
+
+
+class TranscodeWorkerSettings:
+    """
+    Arq worker for CPU-bound transcoding, run as its own service.
+    Concurrency follows the CPU count: each job runs one ffmpeg using
+    TRANSCODE_THREADS threads.
+    """
+    functions = [transcode_media_task]
+    redis_settings = RedisSettings(host=redis_url.hostname, port=redis_url.port)
+    queue_name = TRANSCODE_QUEUE
+    max_jobs = settings.TRANSCODE_MAX_JOBS or max(1, (os.cpu_count() or 1) // max(settings.TRANSCODE_THREADS, 1))
+    job_timeout = settings.TRANSCODE_TIMEOUT
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import yt_dlp
+from yt_dlp.extractor import gen_extractor_classes
+
+from .cookies import cookie_slice
+
+logger = logging.getLogger(__name__)
+
+# Options communes à tous les téléchargements yt-dlp du worker
+YTDLP_OPTIONS = {
+    'quiet': True,
+    'no_warnings': True,
+    'outtmpl': '%(id)s.%(ext)s',
+    'noplaylist': True,
+    'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
+}
+
+# (cookie slice, its mtime) ; None sans cookies
+CookieContext = Optional[Tuple[str, int]]
+
+
+def _cookie_context(url: str) -> CookieContext:
+    src = cookie_slice(url)
+    if src is None:
+        return None
+    try:
+        return str(src), src.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+class PooledYoutubeDL(yt_dlp.YoutubeDL):
+    """
+    A YoutubeDL kept across jobs. It owns a private copy of its cookie slice
+    (yt-dlp writes the jar back when it closes) and forwards progress to the
+    hook of the job currently holding it.
+    """
+
+    def __init__(self, context: CookieContext):
+        self.context = context
+        self.progress_hook: Optional[Callable[[Dict[str, Any]], None]] = None
+        self._cookie_dir = None
+        params = dict(YTDLP_OPTIONS, progress_hooks=[self._forward_progress])
+        if context is not None:
+            self._cookie_dir = tempfile.mkdtemp(prefix="ydl-cookies-")
+            cookie_file = Path(self._cookie_dir) / "cookies.txt"
+            try:
+                shutil.copyfile(context[0], cookie_file)
+                params['cookiefile'] = str(cookie_file)
+            except OSError as e:
+                logger.warning(f"Cookies indisponibles ({e}), téléchargement sans cookies.")
+        super().__init__(params)
+
+    def _forward_progress(self, d: Dict[str, Any]) -> None:
+        if self.progress_hook:
+            self.progress_hook(d)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            if self._cookie_dir:
+                shutil.rmtree(self._cookie_dir, ignore_errors=True)
+
+
+class YoutubeDLPool:
+    """
+    Reusable YoutubeDL instances, one per running job, grouped by cookie
+    context (the site's cookie slice, see cookies.py): a job gets an idle
+    instance built for the same cookies, so extractor instances, the HTTP
+    connection pool and the parsed cookie jar survive from job to job.
+
+    When the backend rewrites a slice its mtime changes and the instances
+    built on the old file are dropped. At most `max_idle` instances are kept;
+    with 0 every lease builds and closes its own instance.
+    """
+
+    def __init__(self, max_idle: int):
+        self.max_idle = max_idle
+        self._idle: List[PooledYoutubeDL] = []
+
+    def _take_idle(self, context: CookieContext) -> Optional[PooledYoutubeDL]:
+        stale = [ydl for ydl in self._idle
+                 if context and ydl.context and ydl.context[0] == context[0] and ydl.context != context]
+        for ydl in stale:
+            self._idle.remove(ydl)
+            ydl.close()
+        for ydl in reversed(self._idle):
+            if ydl.context == context:
+                self._idle.remove(ydl)
+                return ydl
+        return None
+
+    def _give_back(self, ydl: PooledYoutubeDL) -> None:
+        self._idle.append(ydl)
+        while len(self._idle) > self.max_idle:
+            self._idle.pop(0).close()
+
+    @asynccontextmanager
+    async def lease(self, url: str, download_dir: Path,
+                    progress_hook: Optional[Callable[[Dict[str, Any]], None]] = None) -> AsyncIterator[PooledYoutubeDL]:
+        """A YoutubeDL for `url`'s cookies, downloading into `download_dir`, held for the block."""
+        context = _cookie_context(url)
+        ydl = self._take_idle(context)
+        if ydl is None:
+            ydl = await asyncio.get_running_loop().run_in_executor(None, PooledYoutubeDL, context)
+        ydl.params['paths'] = {'home': str(download_dir)}
+        ydl.progress_hook = progress_hook
+        reusable = False
+        try:
+            yield ydl
+            reusable = True
+        except Exception:
+            # Échec d'extraction ou de téléchargement : l'instance reste saine
+            reusable = True
+            raise
+        finally:
+            # Annulation (timeout du job) : un thread peut encore l'utiliser, on l'abandonne
+            ydl.progress_hook = None
+            if reusable:
+                self._give_back(ydl)
+
+    def _warm(self, preload: List[str]) -> PooledYoutubeDL:
+        ydl = PooledYoutubeDL(None)
+        # Compile une fois les _VALID_URL de tous les extracteurs (sinon au premier job)
+        for ie in gen_extractor_classes():
+            ie.suitable("https://example.invalid/")
+        for key in preload:
+            try:
+                ydl.get_info_extractor(key)
+            except Exception as e:
+                logger.warning(f"Extracteur yt-dlp {key} non préchargé: {e}")
+        return ydl
+
+    async def warm(self, preload: List[str]) -> None:
+        """Imports the extractors and plugins, compiles their URL patterns and keeps one instance ready."""
+        ydl = await asyncio.get_running_loop().run_in_executor(None, self._warm, preload)
+        self._give_back(ydl)
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
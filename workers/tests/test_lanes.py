@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from arq.constants import in_progress_key_prefix
+
+from app.config import settings
+from app.lanes import DOWNLOAD_QUEUE, LaneDispatcher, lane_key
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # EVALSHA
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def fill_lane(redis, lane: str, count: int) -> None:
+    await redis.zadd(lane_key(lane), {f"{lane}-{i}": i for i in range(count)})
+
+
+async def queued(redis):
+    return [job.decode() for job in await redis.zrange(DOWNLOAD_QUEUE, 0, -1)]
+
+
+def test_dispatch_tops_up_to_depth(monkeypatch):
+    monkeypatch.setattr(settings, "LANE_QUEUE_DEPTH", 5)
+    monkeypatch.setattr(settings, "LANE_INTERACTIVE_RESERVE", 0)
+
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        await fill_lane(redis, "normal", 20)
+        dispatcher = LaneDispatcher(redis)
+        assert await dispatcher.dispatch() == 5
+        assert await dispatcher.dispatch() == 0
+        assert len(await queued(redis)) == 5
+
+    run(scenario())
+
+
+def test_running_jobs_do_not_take_ready_slots(monkeypatch):
+    monkeypatch.setattr(settings, "LANE_QUEUE_DEPTH", 5)
+    monkeypatch.setattr(settings, "LANE_INTERACTIVE_RESERVE", 0)
+
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        await fill_lane(redis, "normal", 20)
+        dispatcher = LaneDispatcher(redis)
+        await dispatcher.dispatch()
+
+        # Les workers prennent tout : les jobs restent dans arq:queue jusqu'à leur fin
+        for job in await queued(redis):
+            await redis.set(in_progress_key_prefix + job, b"1")
+        assert await dispatcher.dispatch() == 5
+
+        ready = [job for job in await queued(redis) if not await redis.exists(in_progress_key_prefix + job)]
+        assert len(ready) == 5
+        assert len(await queued(redis)) == 10
+
+    run(scenario())
+
+
+def test_weights_share_slots(monkeypatch):
+    monkeypatch.setattr(settings, "LANE_QUEUE_DEPTH", 12)
+    monkeypatch.setattr(settings, "LANE_INTERACTIVE_RESERVE", 0)
+    monkeypatch.setattr(settings, "LANE_WEIGHTS", {"interactive": 8, "normal": 3, "bulk": 1})
+
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        for lane in ("interactive", "normal", "bulk"):
+            await fill_lane(redis, lane, 20)
+        assert await LaneDispatcher(redis).dispatch() == 12
+        jobs = await queued(redis)
+        assert {lane: sum(job.startswith(lane) for job in jobs) for lane in ("interactive", "normal", "bulk")} == {
+            "interactive": 8, "normal": 3, "bulk": 1,
+        }
+
+    run(scenario())
+
+
+def test_click_is_dispatched_ahead_of_a_full_bulk_buffer(monkeypatch):
+    monkeypatch.setattr(settings, "LANE_QUEUE_DEPTH", 10)
+    monkeypatch.setattr(settings, "LANE_INTERACTIVE_RESERVE", 2)
+
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        await fill_lane(redis, "bulk", 50)
+        dispatcher = LaneDispatcher(redis)
+        # Le bulk ne remplit pas les places réservées aux clics
+        assert await dispatcher.dispatch() == 8
+        assert await dispatcher.dispatch() == 0
+
+        await fill_lane(redis, "interactive", 1)
+        assert await dispatcher.dispatch() == 1
+        # arq prend les jobs prêts par score : le clic passe avant tout le bulk
+        assert (await queued(redis))[0] == "interactive-0"
+
+    run(scenario())
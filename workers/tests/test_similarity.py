@@ -0,0 +1,37 @@
+import asyncio
+import random
+
+import pytest
+
+from app.phash import VIDEO_FRAMES, _frame_times
+from app.similarity import CHUNKS, MAX_DISTANCE, chunk_neighbours, chunks, find_similar
+
+
+def test_chunk_neighbours_cover_flipped_bits():
+    values = chunk_neighbours(0b1010, 2)
+    assert values[0] == 0b1010
+    assert len(values) == len(set(values)) == 1 + 16 + 120
+    assert 0b1011 in values and 0b0011 in values and 0b0101 not in values
+
+
+def test_every_hash_within_max_distance_is_a_candidate():
+    rng = random.Random(0)
+    for _ in range(2000):
+        h = rng.getrandbits(64)
+        distance = rng.randint(0, MAX_DISTANCE)
+        g = h
+        for bit in rng.sample(range(64), distance):
+            g ^= 1 << bit
+        probed = [set(chunk_neighbours(c, distance // CHUNKS)) for c in chunks(h)]
+        assert any(c in values for c, values in zip(chunks(g), probed))
+
+
+def test_distances_beyond_exact_recall_are_refused():
+    with pytest.raises(ValueError):
+        asyncio.run(find_similar(None, [1], MAX_DISTANCE + 1, 10))
+
+
+def test_video_frames_are_sampled_at_fixed_fractions_of_the_duration():
+    assert _frame_times(80.0) == [2.5 + 5 * i for i in range(VIDEO_FRAMES)]
+    assert _frame_times(2.0) == [0.25, 0.75, 1.25, 1.75]
+    assert _frame_times(0.0) == [float(i) for i in range(VIDEO_FRAMES)]
@@ -0,0 +1,17 @@
+from app.transcode import is_web_compatible
+
+
+def test_mp4_h264_aac_is_web_compatible():
+    assert is_web_compatible({"ext": "mp4", "vcodec": "avc1.64001F", "acodec": "mp4a.40.2"})
+    assert is_web_compatible({"ext": "mp4", "vcodec": "h264", "acodec": "none"})
+
+
+def test_other_containers_and_codecs_need_transcoding():
+    assert not is_web_compatible({"ext": "webm", "vcodec": "vp9", "acodec": "opus"})
+    assert not is_web_compatible({"ext": "mp4", "vcodec": "hevc", "acodec": "aac"})
+
+
+def test_unknown_codecs_are_not_assumed_compatible():
+    # gallery-dl ne donne pas de codecs : le worker de transcodage sonde le fichier
+    assert not is_web_compatible(None)
+    assert not is_web_compatible({})
@@ -0,0 +1,19 @@
+from app.urls import host_key, platform_for
+
+
+def test_host_key_groups_subdomains():
+    assert host_key("https://vm.tiktok.com/x") == "tiktok.com"
+    assert host_key("https://youtu.be/abc") == "youtube.com"
+
+
+def test_host_key_keeps_site_under_multi_label_suffix():
+    assert host_key("https://www.bbc.co.uk/news") == "bbc.co.uk"
+    assert host_key("https://www.abc.net.au/x") == "abc.net.au"
+    assert host_key("https://www.bbc.co.uk/") != host_key("https://www.theguardian.co.uk/")
+    assert platform_for("https://www.bbc.co.uk/news") == "bbc"
+
+
+def test_host_key_returns_ip_literals_unchanged():
+    assert host_key("http://10.0.0.1:8080/video.mp4") == "10.0.0.1"
+    assert host_key("http://[::1]/video.mp4") == "::1"
+    assert platform_for("http://10.0.0.1/video.mp4") == "10.0.0.1"